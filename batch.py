@@ -0,0 +1,315 @@
+"""
+Command-line batch mode for the match fees tracker.
+
+Runs commands against the club without going through the menus.  The
+club is loaded once, every command is applied, and the changes are saved
+once at the end; if any command fails nothing is saved.
+
+    python batch.py add-player "Sam Jones" "Alex Green"
+    python batch.py add-fixture "Old Boys" 05/09/25 10
+    python batch.py select "Old Boys" 05/09/25 "Sam Jones" "Alex Green"
+    python batch.py pay "Sam Jones" 20 --method card
+    python batch.py balances
+    python batch.py fees-due
+    python batch.py takings 01/09/25 30/09/25
+    python batch.py import fixtures league.csv   # see importer.py
+    python batch.py export matches --output matches.csv   # see export.py
+    python batch.py --file season.txt    # one command per line
+"""
+
+import argparse
+import csv
+import os
+import shlex
+import sys
+
+import export
+import importer
+import run
+from profiling import start_profiling
+
+
+class CommandError(Exception):
+    """A batch command that can't be carried out."""
+
+
+class CommandParser(argparse.ArgumentParser):
+    """Argument parser that raises CommandError instead of exiting."""
+
+    def error(self, message):
+        raise CommandError(message)
+
+
+def find_player(name):
+    """Return the player called name (matched as the menus would type it)."""
+    for candidate in (name, run.smart_title(name)):
+        if candidate in run.players:
+            return candidate
+    raise CommandError(f"Unknown player: {name}")
+
+
+def find_fixture(opponent, date_text):
+    """Return the one fixture against opponent on a DD/MM/YY date."""
+    try:
+        match_date = run.parse_match_date(date_text)
+    except ValueError as error:
+        raise CommandError(error)
+    opponent = run.smart_title(opponent)
+    found = run.find_fixtures(match_date, opponent)
+    if not found:
+        raise CommandError(f"No fixture against {opponent} on {date_text}")
+    if len(found) > 1:
+        raise CommandError(f"More than one fixture against {opponent} on {date_text}")
+    return found[0]
+
+
+def add_players(args):
+    for name_input in args.names:
+        name = run.smart_title(name_input.strip())
+        if not name:
+            raise CommandError("Player name cannot be empty.")
+        if any(ch.isdigit() for ch in name):
+            raise CommandError(f"Player name cannot contain numbers: {name}")
+        if name in run.players:
+            raise CommandError(f"{name} already exists in the player list.")
+        run.create_player(name)
+        print(f"✓ Added: {name}")
+
+
+def add_fixture(args):
+    opponent = run.smart_title(args.opponent.strip())
+    if not opponent:
+        raise CommandError("Opponent cannot be empty.")
+    try:
+        match_date = run.parse_match_date(args.date)
+        fee = run.parse_fee(args.fee)
+    except ValueError as error:
+        raise CommandError(error)
+    if run.find_fixtures(match_date, opponent) and not args.allow_duplicate:
+        raise CommandError(
+            f"You already have {run.club_name} vs {opponent} on "
+            f"{match_date.strftime('%d/%m/%Y')} (use --allow-duplicate)"
+        )
+    run.clash_warning(match_date)
+    run.create_fixture(opponent, match_date, fee)
+    print(
+        f"✓ Fixture added: {run.club_name} vs {opponent} on "
+        f"{match_date.strftime('%d/%m/%Y')} - £{fee:.2f}"
+    )
+
+
+def select_players(args):
+    match = find_fixture(args.opponent, args.date)
+    for name in args.players:
+        player = find_player(name)
+        if not run.is_active(player):
+            raise CommandError(f"{player} is inactive")
+        if run.is_selected(match, player):
+            print(f"- {player} is already selected")
+            continue
+        run.select_player(match, player)
+        print(f"✓ Selected {player} vs {match['opponent']}")
+
+
+def pay(args):
+    player = find_player(args.player)
+    try:
+        paid = run.pay_player_fees(player, args.amount, args.method)
+    except ValueError as error:
+        raise CommandError(f"{player}: {error}")
+    method = run.PAYMENT_METHODS[args.method]
+    print(f"✓ Payment of £{args.amount:.2f} recorded for {player} ({method})")
+    for match in paid:
+        date_fmt = match["date"].strftime("%d %b %y")
+        print(f"  • {date_fmt} vs {match['opponent']}: £{match['fee']:.2f}")
+
+
+def balances(args):
+    for player, due in run.players_owing():
+        print(f"{player}\t{due:.2f}")
+    print(f"TOTAL OUTSTANDING\t{run.total_outstanding_fees():.2f}")
+
+
+def fees_due(args):
+    for player, matches_due, total_due in run.players_with_fees_due():
+        print(f"{player}\t{matches_due}\t{total_due:.2f}")
+
+
+def takings(args):
+    dates = []
+    for text in (args.start, args.end):
+        try:
+            dates.append(run.parse_match_date(text) if text else None)
+        except ValueError as error:
+            raise CommandError(error)
+    for day, by_method in run.takings_by_day(*dates):
+        for method, amount in sorted(by_method.items()):
+            print(f"{day.isoformat()}\t{method}\t{amount:.2f}")
+
+
+def import_file(args):
+    rejects_file = open(args.rejects, "w", newline="") if args.rejects else None
+    rejects = csv.writer(rejects_file) if rejects_file else None
+    if rejects:
+        rejects.writerow(["line", "reason"])
+    imported = rejected = 0
+    try:
+        rows = importer.read_rows(args.path)
+        for number, reason in importer.import_rows(
+            args.kind, rows, args.allow_duplicates, args.method
+        ):
+            if reason is None:
+                imported += 1
+                continue
+            rejected += 1
+            if rejects:
+                rejects.writerow([number, reason])
+            else:
+                print(f"✗ {args.path} line {number}: {reason}")
+    except (OSError, ValueError) as error:
+        raise CommandError(f"Could not read {args.path}: {error}")
+    finally:
+        if rejects_file:
+            rejects_file.close()
+    print(f"✓ Imported {imported} of {imported + rejected} row(s) from {args.path}")
+    if rejected:
+        print(f"⚠ Rejected {rejected} row(s)")
+
+
+def export_report(args):
+    file_format = args.format
+    if file_format is None and args.output:
+        file_format = os.path.splitext(args.output)[1].lstrip(".").lower()
+    if file_format not in export.WRITERS:
+        file_format = "csv"
+    if not args.output:
+        try:
+            export.export_report(args.report, sys.stdout, file_format)
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # e.g. piped into head; stop quietly
+            sys.stdout = open(os.devnull, "w")
+        return
+    try:
+        with open(args.output, "w", newline="") as out:
+            count = export.export_report(args.report, out, file_format)
+    except OSError as error:
+        raise CommandError(f"Could not write {args.output}: {error}")
+    print(f"✓ Exported {count} row(s) to {args.output}")
+
+
+def build_parser():
+    parser = CommandParser(prog="batch.py", add_help=False)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("add-player", help="add players")
+    command.add_argument("names", nargs="+")
+    command.set_defaults(handler=add_players)
+
+    command = commands.add_parser("add-fixture", help="add a fixture")
+    command.add_argument("opponent")
+    command.add_argument("date", help="DD/MM/YY or DD/MM/YYYY")
+    command.add_argument("fee")
+    command.add_argument("--allow-duplicate", action="store_true")
+    command.set_defaults(handler=add_fixture)
+
+    command = commands.add_parser("select", help="pick players for a fixture")
+    command.add_argument("opponent")
+    command.add_argument("date", help="DD/MM/YY or DD/MM/YYYY")
+    command.add_argument("players", nargs="+")
+    command.set_defaults(handler=select_players)
+
+    command = commands.add_parser("pay", help="record a payment (full matches)")
+    command.add_argument("player")
+    command.add_argument("amount", type=float)
+    command.add_argument("--method", choices=list(run.PAYMENT_METHODS), default="cash")
+    command.set_defaults(handler=pay)
+
+    command = commands.add_parser("import", help="import rows from CSV or JSON")
+    command.add_argument("kind", choices=sorted(importer.IMPORTERS))
+    command.add_argument("path")
+    command.add_argument("--allow-duplicates", action="store_true")
+    command.add_argument("--rejects", help="write rejected rows to this CSV file")
+    command.add_argument(
+        "--method",
+        choices=list(run.PAYMENT_METHODS),
+        default="cash",
+        help="payment method for rows without a method column",
+    )
+    command.set_defaults(handler=import_file)
+
+    command = commands.add_parser("export", help="export a report to CSV or JSON")
+    command.add_argument("report", choices=sorted(export.REPORTS))
+    command.add_argument("--format", choices=sorted(export.WRITERS))
+    command.add_argument("--output", help="file to write (default: stdout)")
+    command.set_defaults(handler=export_report)
+
+    command = commands.add_parser("balances", help="player fee balances")
+    command.set_defaults(handler=balances)
+
+    command = commands.add_parser("fees-due", help="active players owing fees")
+    command.set_defaults(handler=fees_due)
+
+    command = commands.add_parser("takings", help="money taken each day, by method")
+    command.add_argument("start", nargs="?", help="DD/MM/YY (default: no limit)")
+    command.add_argument("end", nargs="?", help="DD/MM/YY (default: no limit)")
+    command.set_defaults(handler=takings)
+    return parser
+
+
+def read_commands(path):
+    """Return (line label, words) for each command in a file."""
+    commands = []
+    with open(path, "r") as f:
+        for number, line in enumerate(f, 1):
+            words = shlex.split(line, comments=True)
+            if words:
+                commands.append((f"{path} line {number}", words))
+    return commands
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run match fees commands without the menus.",
+        epilog=(
+            "Commands: add-player, add-fixture, select, pay, import, export, "
+            "balances, fees-due, takings"
+        ),
+    )
+    parser.add_argument("--file", help="run the commands in FILE, one per line")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+
+    commands = []
+    if args.file:
+        commands.extend(read_commands(args.file))
+    if args.command:
+        commands.append(("command", args.command))
+    if not commands:
+        parser.print_help()
+        return 2
+
+    command_parser = build_parser()
+    start_profiling()
+    run.load_data()
+    seq = run.journal_seq
+    label = ""
+    try:
+        with run.batched_changes():
+            for label, words in commands:
+                command = command_parser.parse_args(words)
+                command.handler(command)
+    except CommandError as error:
+        print(f"✗ {label}: {error}")
+        print("Nothing was saved.")
+        return 1
+    finally:
+        run.wait_for_compaction()
+
+    if run.journal_seq != seq:
+        print(f"✓ Saved {run.journal_seq - seq} change(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
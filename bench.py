@@ -0,0 +1,419 @@
+"""
+Benchmarks for the match fees tracker.
+
+Generates a synthetic club of the size asked for in a temporary folder
+and times the hot paths on it: loading and saving, balances, the fee
+summary, team selection availability, paying fees and renaming players.
+Each step reports its best and mean time, throughput and peak memory.
+
+    python bench.py                                    # 300 players, 3 seasons
+    python bench.py --players 1000 --fixtures 80 --seasons 5 --repeat 5
+    python bench.py --storage sqlite --output bench_output.txt
+    python bench.py --save before.json                 # keep the results
+    python bench.py --compare before.json              # flag slower steps
+
+--compare exits with status 1 if any step's best time is more than
+--tolerance slower than in the saved results.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+import run
+from database import open_database
+
+# fmt: off
+FIRST_NAMES = [
+    "Alex", "Ben", "Callum", "Dan", "Ed", "Finn", "George", "Harry", "Isaac",
+    "Jack", "Kieran", "Liam", "Max", "Noah", "Owen", "Patrick", "Rhys", "Sam",
+    "Tom", "Will", "Aaron", "Connor", "Ethan", "Jamie", "Luke", "Matt", "Nathan",
+    "Oscar", "Ryan", "Theo",
+]
+LAST_NAMES = [
+    "Anderson", "Baker", "Clarke", "Davies", "Evans", "Fisher", "Green", "Hughes",
+    "Jones", "King", "Lewis", "Morgan", "Nash", "Owen", "Price", "Roberts",
+    "Smith", "Taylor", "Walker", "Wright", "Bell", "Cooper", "Edwards", "Hall",
+    "Hill", "Jackson", "Martin", "Parker", "Turner", "Young",
+]
+OPPONENTS = [
+    "Old Boys", "Harlequins", "Wanderers", "Saracens", "Corinthians", "Rovers",
+    "Athletic", "Academicals", "Casuals", "Nomads", "Pirates", "Vikings",
+]
+# fmt: on
+FEES = [5.0, 7.5, 10.0, 12.5]
+
+
+def player_names(count, rng):
+    """Return count different made-up player names."""
+    names = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+    initials = "ABCDEFGHIJKLMNOPRSTW"
+    for initial in initials:
+        if len(names) >= count:
+            break
+        names += [
+            f"{first} {initial}. {last}"
+            for first in FIRST_NAMES
+            for last in LAST_NAMES
+        ]
+    if count > len(names):
+        raise ValueError(f"Can't make up more than {len(names)} player names")
+    rng.shuffle(names)
+    return names[:count]
+
+
+def synthetic_club(options):
+    """
+    Return a snapshot (as saved in data.json) of a made-up club: options
+    .seasons seasons up to the current one, each with options.fixtures
+    fixtures spread over the year.
+    """
+    rng = random.Random(options.seed)
+    names = player_names(options.players, rng)
+    ids = list(range(1, len(names) + 1))
+    inactive = sorted(rng.sample(ids, round(options.inactive * len(ids))))
+    active = sorted(set(ids) - set(inactive))
+    team_size = max(1, min(len(active), round(options.density * len(active))))
+    methods = list(run.PAYMENT_METHODS)
+    today = date.today()
+
+    matches = []
+    current = run.season_of(today)
+    for season in range(current - options.seasons + 1, current + 1):
+        start = date(season, run.SEASON_START_MONTH, 1)
+        for n in range(options.fixtures):
+            day = start + timedelta(days=n * 365 // options.fixtures)
+            fee = rng.choice(FEES)
+            team = sorted(rng.sample(active, team_size))
+            paid = []
+            if day <= today:
+                paid = [p for p in team if rng.random() < options.paid]
+            matches.append(
+                {
+                    "id": len(matches) + 1,
+                    "opponent": rng.choice(OPPONENTS),
+                    "date": day.isoformat(),
+                    "fee": fee,
+                    "players": team,
+                    "paid": paid,
+                    "payments": [
+                        {
+                            "player": p,
+                            "amount": fee,
+                            "method": rng.choice(methods),
+                            "time": f"{day}T{rng.randint(10, 17)}:00:00",
+                        }
+                        for p in paid
+                    ],
+                }
+            )
+    return {
+        "club_name": "Benchmark RFC",
+        "players": [{"id": i, "name": name} for i, name in zip(ids, names)],
+        "inactive_players": inactive,
+        "journal_seq": 0,
+        "matches": matches,
+        "seasons": {},
+    }
+
+
+def save_step(options):
+    run.save_data()
+    return len(run.matches)
+
+
+def load_step(options):
+    run.load_data()
+    return len(run.matches)
+
+
+def load_all_step(options):
+    run.load_data()
+    run.load_seasons_between()
+    return len(run.matches)
+
+
+def balances_step(options):
+    run.players_owing()
+    run.players_with_fees_due()
+    run.total_outstanding_fees()
+    return len(run.players)
+
+
+def fee_summary_step(options):
+    run.match_fee_summary(run.matches)
+    return len(run.matches)
+
+
+def availability_step(options):
+    """The counts and lists the team selection screens show for each match."""
+    for match in run.get_matches_sorted():
+        run.available_count(match)
+        run.available_players(match)
+    return len(run.matches)
+
+
+def pay_step(options):
+    """Pay the oldest unpaid match fee for up to options.changes players."""
+    paid = 0
+    for player, _ in run.players_owing()[: options.changes]:
+        unpaid = run.player_unpaid_matches(player)
+        if unpaid:
+            run.pay_player_fees(player, unpaid[0]["fee"], "card")
+            paid += 1
+    return paid
+
+
+def rename_step(options):
+    """Rename up to options.changes players and change them back."""
+    chosen = run.players[: options.changes]
+    for name in chosen:
+        run.rename_player(name, f"{name} Renamed")
+    for name in chosen:
+        run.rename_player(f"{name} Renamed", name)
+    return 2 * len(chosen)
+
+
+# (label, step) in the order they run; steps that change the club are
+# saved as they would be from the menus (journal or database)
+STEPS = [
+    ("save_data", save_step),
+    ("load_data", load_step),
+    ("balances", balances_step),
+    ("fee summary", fee_summary_step),
+    ("availability", availability_step),
+    ("pay fees", pay_step),
+    ("rename players", rename_step),
+    ("load all seasons", load_all_step),
+]
+
+# Options that change the club or the work done, so results made with
+# different values aren't comparable
+SCALE_OPTIONS = [
+    "players",
+    "fixtures",
+    "seasons",
+    "density",
+    "paid",
+    "inactive",
+    "changes",
+    "seed",
+    "storage",
+]
+
+
+def time_step(step, options):
+    """Return the items handled and each run's seconds for a step."""
+    seconds = []
+    items = 0
+    for _ in range(options.repeat):
+        start = time.perf_counter()
+        items = step(options)
+        run.wait_for_compaction()
+        seconds.append(time.perf_counter() - start)
+    return items, seconds
+
+
+def peak_memory(step, options):
+    """Return the most memory (in bytes) allocated while a step runs."""
+    tracemalloc.start()
+    try:
+        step(options)
+        run.wait_for_compaction()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_benchmarks(options):
+    """Generate the club, run every step and return the results."""
+    snapshot = synthetic_club(options)
+    run.STORAGE = options.storage
+    if options.storage == "sqlite":
+        run.database = open_database(run.DATABASE_FILE)
+    start = time.perf_counter()
+    run.load_snapshot(snapshot)
+    generated = time.perf_counter() - start
+
+    results = {}
+    for label, step in STEPS:
+        items, seconds = time_step(step, options)
+        results[label] = {
+            "items": items,
+            "best": min(seconds),
+            "mean": statistics.mean(seconds),
+            "peak": peak_memory(step, options) if options.memory else None,
+        }
+    if run.database is not None:
+        run.database.close()
+        run.database = None
+    return generated, len(snapshot["matches"]), results
+
+
+def report_lines(options, generated, match_count, results):
+    inactive = round(options.inactive * options.players)
+    lines = [
+        f"Synthetic club: {options.players} players ({inactive} inactive), "
+        f"{options.seasons} season(s) x {options.fixtures} fixtures "
+        f"= {match_count} matches",
+        f"Teams of {options.density:.0%} of the squad, {options.paid:.0%} paid, "
+        f"{options.storage} storage, best of {options.repeat}, "
+        f"built in {generated * 1000:.1f} ms",
+        "",
+        f"{'Step':<18} {'Items':>7} {'Best ms':>9} {'Mean ms':>9} "
+        f"{'Items/s':>11} {'Peak MB':>8}",
+        "-" * 67,
+    ]
+    for label, result in results.items():
+        rate = result["items"] / result["best"] if result["best"] else 0
+        peak = "-" if result["peak"] is None else f"{result['peak'] / 2**20:.2f}"
+        lines.append(
+            f"{label:<18} {result['items']:>7} {result['best'] * 1000:>9.2f} "
+            f"{result['mean'] * 1000:>9.2f} {rate:>11.0f} {peak:>8}"
+        )
+    lines.append("-" * 67)
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        lines.append(f"Peak process memory: {rss / scale:.1f} MB")
+    return lines
+
+
+def compare_results(path, options, results):
+    """
+    Return a warning line for each step more than options.tolerance
+    slower (by best time) than in the results saved at path.
+    """
+    with open(path, "r") as f:
+        saved = json.load(f)
+    before = saved["results"]
+    warnings = []
+    differ = [
+        f"--{name} {saved['options'][name]}"
+        for name in SCALE_OPTIONS
+        if saved["options"].get(name) != getattr(options, name)
+    ]
+    if differ:
+        warnings.append(f"Note: {path} was made with {', '.join(differ)}")
+    for label, result in results.items():
+        if label not in before or not before[label]["best"]:
+            continue
+        change = result["best"] / before[label]["best"] - 1
+        if change > options.tolerance:
+            warnings.append(
+                f"⚠ {label} is {change:.0%} slower: "
+                f"{before[label]['best'] * 1000:.2f} ms -> "
+                f"{result['best'] * 1000:.2f} ms"
+            )
+    return warnings
+
+
+def add_club_options(parser):
+    """Add the options that set the size and shape of the made-up club."""
+    parser.add_argument("--players", type=int, default=300)
+    parser.add_argument("--fixtures", type=int, default=60, help="per season")
+    parser.add_argument("--seasons", type=int, default=3)
+    parser.add_argument(
+        "--density",
+        type=float,
+        default=0.05,
+        help="share of the active squad picked for each match (default 0.05)",
+    )
+    parser.add_argument(
+        "--paid", type=float, default=0.8, help="share of past fees paid"
+    )
+    parser.add_argument(
+        "--inactive", type=float, default=0.1, help="share of players inactive"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+
+
+def club_options_valid(options):
+    """Return True if the club options make sense, else print why not."""
+    if options.players < 1 or options.fixtures < 1 or options.seasons < 1:
+        print("⚠ --players, --fixtures and --seasons must be at least 1")
+        return False
+    return True
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Time the match fees tracker on a made-up club."
+    )
+    add_club_options(parser)
+    parser.add_argument(
+        "--changes",
+        type=int,
+        default=50,
+        help="players paying and renamed per run (default 50)",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json")
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="skip the (slower) peak memory runs",
+    )
+    parser.add_argument("--output", help="also write the report to this file")
+    parser.add_argument("--save", help="save the results as JSON for --compare")
+    parser.add_argument("--compare", help="results saved earlier with --save")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="how much slower a step may get before --compare fails",
+    )
+    return parser
+
+
+def main(argv=None):
+    options = build_parser().parse_args(argv)
+    if not club_options_valid(options):
+        return 2
+    if options.repeat < 1:
+        print("⚠ --repeat must be at least 1")
+        return 2
+
+    here = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="match-fees-bench-") as folder:
+        os.chdir(folder)
+        try:
+            generated, match_count, results = run_benchmarks(options)
+        finally:
+            os.chdir(here)
+
+    lines = report_lines(options, generated, match_count, results)
+    warnings = []
+    if options.compare:
+        warnings = compare_results(options.compare, options, results)
+        if not any(w.startswith("⚠") for w in warnings):
+            warnings.append(f"✓ No step more than {options.tolerance:.0%} slower")
+        lines += [""] + warnings
+    print("\n".join(lines))
+
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump({"options": vars(options), "results": results}, f, indent=2)
+        print(f"✓ Results saved to {options.save}")
+    return 1 if any(w.startswith("⚠") for w in warnings) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
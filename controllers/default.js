@@ -1,43 +1,265 @@
 const Pty = require('node-pty');
 const fs = require('fs');
+const childProcess = require('child_process');
+
+// Every terminal is connected to one shared `python3 server.py`, so all
+// visitors work on the same club.  With TERMINAL_SERVER=0 they are served
+// from a pool of `python3 run.py --wait` workers that have already started
+// Python and loaded the club instead (see wait_to_start() in run.py); only
+// one of those can have the club open at a time.
+const POOL_SIZE = parseInt(process.env.TERMINAL_POOL_SIZE || '2');
+// Idle workers older than this many seconds are replaced with fresh ones
+const POOL_MAX_IDLE = parseInt(process.env.TERMINAL_POOL_MAX_IDLE || '600');
+// Most terminals open at once (0 for no limit)
+const MAX_SESSIONS = parseInt(process.env.TERMINAL_MAX_SESSIONS || '0');
+// Written by a worker once it is ready to be started
+const READY_MARKER = '\x1b]match-fees-ready\x07';
+// Set TERMINAL_SERVER=0 to give each visitor their own run.py from the pool
+// instead of connecting every terminal to the shared server
+const SERVER_MODE = process.env.TERMINAL_SERVER !== '0';
+// GET /metrics answers requests from this machine, or from anywhere with
+// ?token= set to TERMINAL_METRICS_TOKEN
+const METRICS_TOKEN = process.env.TERMINAL_METRICS_TOKEN || '';
+// Also log the metrics every this many seconds (0 for never)
+const METRICS_LOG = parseInt(process.env.TERMINAL_METRICS_LOG || '0');
+// Latencies kept for the averages and percentiles
+const METRICS_SAMPLES = 200;
+// Terminal output arriving within this many ms is sent to the browser as
+// one websocket frame (0 to send each piece as it comes)
+const OUTPUT_COALESCE_MS = parseInt(process.env.TERMINAL_COALESCE_MS || '8');
+// A frame is sent straight away once this much output is waiting
+const OUTPUT_MAX_FRAME = 64 * 1024;
+
+var pool = [];
+var sessions = 0;
+var live = [];
+var metrics = {
+    started: Date.now(),
+    opened: 0,
+    closed: 0,
+    rejected: 0,
+    killedOnClose: 0,
+    workerExits: 0,
+    bytesIn: 0,
+    bytesOut: 0,
+    framesOut: 0,
+    // ms from spawning a waiting worker to its club being loaded
+    spawnLatency: [],
+    // ms from a visitor connecting to the first menu output reaching them
+    firstOutputLatency: []
+};
 
 exports.install = function () {
 
     ROUTE('/');
+    ROUTE('GET /metrics', metricsRoute);
     WEBSOCKET('/', socket, ['raw']);
 
-};
+    if (METRICS_LOG > 0) {
+        setInterval(function () {
+            console.log('Terminal metrics ' + JSON.stringify(metricsSummary()));
+        }, METRICS_LOG * 1000);
+    }
 
-function socket() {
+    if (SERVER_MODE) {
+        startServer();
+    } else {
+        fillPool();
+        setInterval(recyclePool, 60 * 1000);
+    }
 
-    this.encodedecode = false;
-    this.autodestroy();
+};
 
-    this.on('open', function (client) {
+function startServer() {
+    var server = childProcess.spawn('python3', ['server.py'], {
+        cwd: process.env.PWD,
+        env: process.env,
+        stdio: 'inherit'
+    });
+    server.on('exit', function (code) {
+        console.log("Match fees server stopped (" + code + "), restarting");
+        setTimeout(startServer, 1000);
+    });
+}
+
+function spawnWorker() {
 
-        // Spawn terminal
-        client.tty = Pty.spawn('python3', ['run.py'], {
+    // In server mode a terminal is just a thin client for the shared server
+    var waits = !SERVER_MODE;
+    var args = waits ? ['run.py', '--wait'] : ['server.py', '--connect'];
+    var worker = {
+        tty: Pty.spawn('python3', args, {
             name: 'xterm-color',
             cols: 80,
             rows: 24,
             cwd: process.env.PWD,
             env: process.env
-        });
+        }),
+        client: null,
+        waits: waits,
+        ready: !waits,
+        output: [],
+        started: Date.now(),
+        attached: 0,
+        firstOutput: false,
+        bytesIn: 0,
+        bytesOut: 0,
+        framesOut: 0,
+        pending: [],
+        pendingBytes: 0,
+        flushTimer: null
+    };
 
-        client.tty.on('exit', function (code, signal) {
+    worker.tty.on('data', function (data) {
+        if (!worker.ready && data.indexOf(READY_MARKER) !== -1) {
+            worker.ready = true;
+            addSample(metrics.spawnLatency, Date.now() - worker.started);
+            data = data.replace(READY_MARKER, '');
+            worker.client && worker.tty.kill('SIGUSR1');
+        }
+        if (!data) {
+            return;
+        }
+        // Keep anything printed while loading (e.g. warnings) for the visitor
+        if (worker.client) {
+            if (worker.ready && !worker.firstOutput) {
+                worker.firstOutput = true;
+                addSample(metrics.firstOutputLatency, Date.now() - worker.attached);
+            }
+            sendOutput(worker, data);
+        } else {
+            worker.output.push(data);
+        }
+    });
+
+    worker.tty.on('exit', function (code, signal) {
+        metrics.workerExits++;
+        forget(worker);
+        var index = pool.indexOf(worker);
+        if (index !== -1) {
+            // A waiting worker died; replace it after a short pause
+            pool.splice(index, 1);
+            setTimeout(fillPool, 1000);
+        }
+        if (worker.client) {
+            flushOutput(worker);
+            var client = worker.client;
+            worker.client = null;
             client.tty = null;
             client.close();
             console.log("Process killed");
-        });
+        }
+    });
+
+    return worker;
+}
+
+function sendOutput(worker, data) {
+    var bytes = Buffer.byteLength(data);
+    worker.bytesOut += bytes;
+    metrics.bytesOut += bytes;
+    worker.pending.push(data);
+    worker.pendingBytes += bytes;
+    if (!OUTPUT_COALESCE_MS || worker.pendingBytes >= OUTPUT_MAX_FRAME) {
+        flushOutput(worker);
+    } else if (!worker.flushTimer) {
+        worker.flushTimer = setTimeout(function () {
+            flushOutput(worker);
+        }, OUTPUT_COALESCE_MS);
+    }
+}
 
-        client.tty.on('data', function (data) {
-            client.send(data);
-        });
+// Send the output waiting for a terminal's visitor as one frame
+function flushOutput(worker) {
+    clearTimeout(worker.flushTimer);
+    worker.flushTimer = null;
+    if (!worker.pending.length) {
+        return;
+    }
+    var data = worker.pending.length === 1 ? worker.pending[0] : worker.pending.join('');
+    worker.pending = [];
+    worker.pendingBytes = 0;
+    if (worker.client) {
+        worker.client.send(data);
+        worker.framesOut++;
+        metrics.framesOut++;
+    }
+}
+
+function forget(worker) {
+    var index = live.indexOf(worker);
+    index !== -1 && live.splice(index, 1);
+}
+
+function fillPool() {
+    while (pool.length < POOL_SIZE) {
+        pool.push(spawnWorker());
+    }
+}
+
+function recyclePool() {
+    var now = Date.now();
+    pool.slice().forEach(function (worker) {
+        if (now - worker.started > POOL_MAX_IDLE * 1000) {
+            pool.splice(pool.indexOf(worker), 1);
+            worker.tty.kill(9);
+        }
+    });
+    fillPool();
+}
+
+function attachWorker(client) {
+    var worker = pool.shift() || spawnWorker();
+    SERVER_MODE || fillPool();
+
+    worker.client = client;
+    worker.attached = Date.now();
+    client.tty = worker.tty;
+    client.worker = worker;
+    live.push(worker);
+    worker.output.forEach(function (data) {
+        sendOutput(worker, data);
+    });
+    worker.output = [];
+    // Workers still loading are started as soon as they are ready
+    worker.waits && worker.ready && worker.tty.kill('SIGUSR1');
+}
+
+function socket() {
+
+    this.encodedecode = false;
+    this.autodestroy();
+
+    this.on('open', function (client) {
+
+        if (MAX_SESSIONS && sessions >= MAX_SESSIONS) {
+            metrics.rejected++;
+            client.send('The tracker is busy right now. Please try again shortly.\r\n');
+            client.close();
+            return;
+        }
+
+        sessions++;
+        metrics.opened++;
+        client.session = true;
+        attachWorker(client);
 
     });
 
     this.on('close', function (client) {
+        if (client.session) {
+            client.session = false;
+            sessions--;
+            metrics.closed++;
+        }
+        if (client.worker) {
+            clearTimeout(client.worker.flushTimer);
+            client.worker.pending = [];
+            forget(client.worker);
+            client.worker = null;
+        }
         if (client.tty) {
+            metrics.killedOnClose++;
             client.tty.kill(9);
             client.tty = null;
             console.log("Process killed and terminal unloaded");
@@ -45,8 +267,110 @@ function socket() {
     });
 
     this.on('message', function (client, msg) {
-        client.tty && client.tty.write(msg);
+        if (client.tty) {
+            var bytes = Buffer.byteLength(msg);
+            metrics.bytesIn += bytes;
+            client.worker && (client.worker.bytesIn += bytes);
+            client.tty.write(msg);
+        }
+    });
+}
+
+function addSample(samples, value) {
+    samples.push(value);
+    samples.length > METRICS_SAMPLES && samples.shift();
+}
+
+function latency(samples) {
+    if (!samples.length) {
+        return null;
+    }
+    var sorted = samples.slice().sort(function (a, b) {
+        return a - b;
     });
+    var total = sorted.reduce(function (sum, value) {
+        return sum + value;
+    }, 0);
+    return {
+        samples: sorted.length,
+        mean: Math.round(total / sorted.length),
+        p50: sorted[Math.floor((sorted.length - 1) * 0.5)],
+        p95: sorted[Math.floor((sorted.length - 1) * 0.95)],
+        max: sorted[sorted.length - 1]
+    };
+}
+
+// Resident memory of a process in kB (Linux only; null elsewhere)
+function residentKb(pid) {
+    try {
+        var status = fs.readFileSync('/proc/' + pid + '/status', 'utf8');
+        var match = status.match(/^VmRSS:\s+(\d+) kB/m);
+        return match ? parseInt(match[1]) : null;
+    } catch (err) {
+        return null;
+    }
+}
+
+function metricsSummary() {
+    var now = Date.now();
+    var memory = process.memoryUsage();
+    return {
+        mode: SERVER_MODE ? 'server' : 'pool',
+        uptime: Math.round((now - metrics.started) / 1000),
+        sessions: {
+            live: sessions,
+            opened: metrics.opened,
+            closed: metrics.closed,
+            rejected: metrics.rejected,
+            killedOnClose: metrics.killedOnClose,
+            max: MAX_SESSIONS || null
+        },
+        pool: {
+            size: POOL_SIZE,
+            waiting: pool.length,
+            ready: pool.filter(function (worker) {
+                return worker.ready;
+            }).length,
+            workerExits: metrics.workerExits
+        },
+        spawnLatencyMs: latency(metrics.spawnLatency),
+        firstOutputLatencyMs: latency(metrics.firstOutputLatency),
+        bytes: {
+            in: metrics.bytesIn,
+            out: metrics.bytesOut
+        },
+        framesOut: metrics.framesOut,
+        node: {
+            rssKb: Math.round(memory.rss / 1024),
+            heapUsedKb: Math.round(memory.heapUsed / 1024)
+        },
+        live: live.map(function (worker) {
+            var seconds = Math.max((now - worker.attached) / 1000, 0.001);
+            return {
+                pid: worker.tty.pid,
+                seconds: Math.round(seconds),
+                bytesIn: worker.bytesIn,
+                bytesOut: worker.bytesOut,
+                framesOut: worker.framesOut,
+                bytesOutPerSecond: Math.round(worker.bytesOut / seconds),
+                rssKb: residentKb(worker.tty.pid)
+            };
+        })
+    };
+}
+
+function metricsRoute() {
+    var self = this;
+    // self.ip comes from X-Forwarded-For, which callers can set, so go by
+    // the socket's own address and count anything forwarded as remote
+    var socket = self.req.connection || self.req.socket || {};
+    var local = !self.req.headers['x-forwarded-for']
+        && ['127.0.0.1', '::1', '::ffff:127.0.0.1'].indexOf(socket.remoteAddress) !== -1;
+    if (!local && !(METRICS_TOKEN && self.query.token === METRICS_TOKEN)) {
+        self.throw404();
+        return;
+    }
+    self.json(metricsSummary());
 }
 
 if (process.env.CREDS != null) {
@@ -57,4 +381,4 @@ if (process.env.CREDS != null) {
             socket.emit("console_output", "Error saving credentials: " + err);
         }
     });
-}
\ No newline at end of file
+}
@@ -0,0 +1,163 @@
+"""
+File storage for the match fees tracker.
+
+The club is kept as a JSON snapshot (data.json) plus an append-only
+journal of changes made since that snapshot was written.  Each journal
+line is one JSON object carrying a "seq" number; the snapshot records
+the last seq it includes so older journal lines can be skipped.
+
+Matches from past seasons are moved out of the snapshot into one file per
+season (data.season-2024.json and so on), which is only read when needed.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+journal_lock = threading.Lock()
+
+
+def fsync_directory(path):
+    """Flush the directory entry for path so a rename survives a crash."""
+    if os.name != "posix":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def backup_paths(path, backups):
+    """Return the rolling backup file names for path, newest first."""
+    return [f"{path}.{n}" for n in range(1, backups + 1)]
+
+
+def rotate_backups(path, backups):
+    """Shift path.1 -> path.2 ... and keep the current file as path.1."""
+    if backups <= 0 or not os.path.exists(path):
+        return
+    names = backup_paths(path, backups)
+    for older, newer in zip(reversed(names[:-1]), reversed(names[1:])):
+        if os.path.exists(older):
+            os.replace(older, newer)
+    # A hard link keeps the old contents as path.1 once path is replaced
+    if os.path.exists(names[0]):
+        os.remove(names[0])
+    try:
+        os.link(path, names[0])
+    except OSError:
+        shutil.copy2(path, names[0])
+
+
+def write_snapshot(path, data, backups=0):
+    """
+    Write the full club snapshot to path and return the time taken.
+
+    The snapshot is written to a temporary file, flushed to disk and then
+    renamed over path, so a crash or full disk never leaves a half-written
+    data file behind.  The previous file is kept as path.1 (and so on) when
+    backups is set.
+    """
+    start = time.perf_counter()
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        rotate_backups(path, backups)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_directory(path)
+    return time.perf_counter() - start
+
+
+def season_file(path, season):
+    """Return the file an archived season of path is kept in."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.season-{season}{ext}"
+
+
+def read_snapshot(path):
+    """Return the club snapshot stored at path."""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def append_journal(path, change):
+    """Append a single change to the journal file."""
+    line = json.dumps(change, separators=(",", ":")) + "\n"
+    with journal_lock:
+        with open(path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_journal(path):
+    """
+    Yield the changes stored in the journal file, oldest first.
+    A half-written last line (e.g. after a crash) is ignored.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                break
+
+
+def trim_journal(path, seq):
+    """Drop journal changes already included in a snapshot up to seq."""
+    with journal_lock:
+        if not os.path.exists(path):
+            return
+        keep = [c for c in read_journal(path) if c.get("seq", 0) > seq]
+        if not keep:
+            os.remove(path)
+            return
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            for change in keep:
+                f.write(json.dumps(change, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        fsync_directory(path)
+
+
+def lock_file(path):
+    """
+    Open path and take an exclusive lock on it, held until the returned
+    file is closed.  Returns None if another process holds the lock.
+    Where file locks aren't available the lock is always granted.
+    """
+    f = open(path, "a")
+    if fcntl is not None:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return None
+    return f
+
+
+def remove_files(*paths):
+    """Delete the given files if they exist."""
+    with journal_lock:
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
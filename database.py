@@ -0,0 +1,457 @@
+"""
+SQLite storage for the match fees tracker.
+
+An alternative to data.json for clubs with a long history: players,
+fixtures, selections and payments live in their own indexed tables, and
+each change from run.py is written as a single small transaction instead
+of rewriting the whole club.  Teams and payments refer to players by id,
+so renaming a player updates one row.
+
+Run this module to copy an existing data.json (and its journal) into a
+database:
+
+    python database.py [data.json] [data.db]
+"""
+
+import os
+import sqlite3
+import sys
+import time
+
+from data import read_journal, read_snapshot, season_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS club (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS inactive_players (
+    id INTEGER PRIMARY KEY,
+    player_id INTEGER NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS fixtures (
+    id INTEGER PRIMARY KEY,
+    opponent TEXT NOT NULL,
+    date TEXT NOT NULL,
+    fee REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fixtures_by_date ON fixtures (date, id);
+CREATE TABLE IF NOT EXISTS selections (
+    match_id INTEGER NOT NULL,
+    player_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS selections_by_match ON selections (match_id);
+CREATE INDEX IF NOT EXISTS selections_by_player ON selections (player_id);
+CREATE TABLE IF NOT EXISTS payments (
+    match_id INTEGER NOT NULL,
+    player_id INTEGER NOT NULL,
+    amount REAL,
+    method TEXT,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS payments_by_match ON payments (match_id);
+CREATE INDEX IF NOT EXISTS payments_by_player ON payments (player_id);
+CREATE INDEX IF NOT EXISTS payments_by_time ON payments (time);
+"""
+
+# Fixture fields an edit_fixture change may update
+FIXTURE_COLUMNS = ("opponent", "date", "fee")
+
+# Tables that named players (and their indexes) before players had ids
+NAMED_TABLES = ("inactive_players", "selections", "payments")
+NAMED_INDEXES = (
+    "selections_by_match",
+    "selections_by_player",
+    "payments_by_match",
+    "payments_by_player",
+    "payments_by_time",
+)
+
+
+def open_database(path):
+    """Open (creating if needed) the club database at path."""
+    # server.py shares one connection between its session threads, taking
+    # turns under its state lock
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if "player" in table_columns(conn, "selections"):
+        upgrade_player_ids(conn)
+    else:
+        conn.executescript(SCHEMA)
+    return conn
+
+
+def table_columns(conn, table):
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def upgrade_player_ids(conn):
+    """
+    Rebuild the tables of a database made before players had ids so they
+    refer to players by id, in one transaction.  Payments from before
+    payment details were kept get NULL amount, method and time.
+    """
+    details = table_columns(conn, "payments") & {"amount", "method", "time"}
+    amount, method, paid_at = (
+        f"o.{column}" if column in details else "NULL"
+        for column in ("amount", "method", "time")
+    )
+    script = ["BEGIN;"]
+    script += [f"ALTER TABLE {table} RENAME TO old_{table};" for table in NAMED_TABLES]
+    script += [f"DROP INDEX IF EXISTS {index};" for index in NAMED_INDEXES]
+    script.append(SCHEMA)
+    script.append(
+        f"""
+        INSERT INTO inactive_players (player_id)
+        SELECT p.id FROM old_inactive_players AS o
+        JOIN players AS p ON p.name = o.name ORDER BY o.id;
+        INSERT INTO selections (match_id, player_id)
+        SELECT o.match_id, p.id FROM old_selections AS o
+        JOIN players AS p ON p.name = o.player ORDER BY o.rowid;
+        INSERT INTO payments (match_id, player_id, amount, method, time)
+        SELECT o.match_id, p.id, {amount}, {method}, {paid_at}
+        FROM old_payments AS o
+        JOIN players AS p ON p.name = o.player ORDER BY o.rowid;
+        """
+    )
+    script += [f"DROP TABLE old_{table};" for table in NAMED_TABLES]
+    script.append("COMMIT;")
+    try:
+        conn.executescript("\n".join(script))
+    except sqlite3.Error:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+
+def player_id(conn, player):
+    """
+    Return the id of a player referred to by id, or by name as in files
+    and journals saved before players had ids.
+    """
+    if isinstance(player, int):
+        return player
+    row = conn.execute("SELECT id FROM players WHERE name = ?", (player,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown player: {player}")
+    return row[0]
+
+
+def has_club(conn):
+    """Return True if a club has been written to the database."""
+    return conn.execute("SELECT 1 FROM club LIMIT 1").fetchone() is not None
+
+
+def numbered_matches(matches):
+    """
+    Return the snapshot matches with an id each, numbering any that lack
+    one after the highest id in use (as run.number_matches does).
+    """
+    next_id = max((int(m["id"]) for m in matches if "id" in m), default=0) + 1
+    result = []
+    for m in matches:
+        if "id" not in m:
+            m = dict(m, id=next_id)
+            next_id += 1
+        result.append(m)
+    return result
+
+
+def insert_fixture(conn, m):
+    """Insert a fixture and its team and payments from its JSON form."""
+    conn.execute(
+        "INSERT INTO fixtures (id, opponent, date, fee) VALUES (?, ?, ?, ?)",
+        (int(m["id"]), m["opponent"], m["date"], float(m["fee"])),
+    )
+    conn.executemany(
+        "INSERT INTO selections (match_id, player_id) VALUES (?, ?)",
+        [(m["id"], player_id(conn, p)) for p in m.get("players", [])],
+    )
+    if "payments" in m:
+        payments = m["payments"]
+    else:
+        payments = [{"player": p, "amount": m["fee"]} for p in m.get("paid", [])]
+    conn.executemany(
+        "INSERT INTO payments (match_id, player_id, amount, method, time) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                m["id"],
+                player_id(conn, p["player"]),
+                p["amount"],
+                p.get("method"),
+                p.get("time"),
+            )
+            for p in payments
+        ],
+    )
+
+
+def write_club(conn, snapshot):
+    """
+    Replace everything in the database with a club snapshot and return
+    the time taken.
+    """
+    start = time.perf_counter()
+    with conn:
+        for table in (
+            "club",
+            "players",
+            "inactive_players",
+            "fixtures",
+            "selections",
+            "payments",
+        ):
+            conn.execute(f"DELETE FROM {table}")
+        conn.executemany(
+            "INSERT INTO club (key, value) VALUES (?, ?)",
+            [
+                ("club_name", snapshot.get("club_name", "")),
+                ("journal_seq", str(snapshot.get("journal_seq", 0))),
+            ],
+        )
+        # Snapshots saved before players had ids list plain names
+        conn.executemany(
+            "INSERT OR IGNORE INTO players (id, name) VALUES (?, ?)",
+            [
+                (p["id"], p["name"]) if isinstance(p, dict) else (None, p)
+                for p in snapshot.get("players", [])
+            ],
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO inactive_players (player_id) VALUES (?)",
+            [(player_id(conn, p),) for p in snapshot.get("inactive_players", [])],
+        )
+        for m in numbered_matches(snapshot.get("matches", [])):
+            insert_fixture(conn, m)
+    return time.perf_counter() - start
+
+
+def read_club(conn):
+    """Return the club in the same form as a data.json snapshot."""
+    settings = dict(conn.execute("SELECT key, value FROM club"))
+    team = {}
+    for match_id, player in conn.execute(
+        "SELECT match_id, player_id FROM selections ORDER BY rowid"
+    ):
+        team.setdefault(match_id, []).append(player)
+    payments = {}
+    for match_id, player, amount, method, paid_at in conn.execute(
+        "SELECT match_id, player_id, amount, method, time FROM payments "
+        "ORDER BY rowid"
+    ):
+        payments.setdefault(match_id, []).append(
+            {"player": player, "amount": amount, "method": method, "time": paid_at}
+        )
+
+    return {
+        "club_name": settings.get("club_name", ""),
+        "journal_seq": int(settings.get("journal_seq", 0)),
+        "players": [
+            {"id": player, "name": name}
+            for player, name in conn.execute("SELECT id, name FROM players ORDER BY id")
+        ],
+        "inactive_players": [
+            player
+            for (player,) in conn.execute(
+                "SELECT player_id FROM inactive_players ORDER BY id"
+            )
+        ],
+        "matches": [
+            {
+                "id": match_id,
+                "opponent": opponent,
+                "date": match_date,
+                "fee": fee,
+                "players": team.get(match_id, []),
+                "paid": [p["player"] for p in payments.get(match_id, [])],
+                "payments": [
+                    dict(p, amount=fee if p["amount"] is None else p["amount"])
+                    for p in payments.get(match_id, [])
+                ],
+            }
+            for match_id, opponent, match_date, fee in conn.execute(
+                "SELECT id, opponent, date, fee FROM fixtures ORDER BY id"
+            )
+        ],
+    }
+
+
+def delete_first(conn, table, match_id, player):
+    """Delete one matching row, as list.remove() would."""
+    conn.execute(
+        f"DELETE FROM {table} WHERE rowid = "
+        f"(SELECT rowid FROM {table} WHERE match_id = ? AND player_id = ? "
+        "ORDER BY rowid LIMIT 1)",
+        (match_id, player_id(conn, player)),
+    )
+
+
+def store_change(conn, change):
+    """Write one change record (see run.apply_change) as a transaction."""
+    with conn:
+        write_change(conn, change)
+
+
+def store_changes(conn, changes):
+    """Write a batch of change records as a single transaction."""
+    with conn:
+        for change in changes:
+            write_change(conn, change)
+
+
+def write_change(conn, change):
+    """Write one change record to the tables."""
+    op = change["op"]
+    if op == "club_name":
+        conn.execute(
+            "INSERT OR REPLACE INTO club (key, value) VALUES ('club_name', ?)",
+            (change["name"],),
+        )
+    elif op == "add_player":
+        conn.execute(
+            "INSERT INTO players (id, name) VALUES (?, ?)",
+            (change.get("id"), change["player"]),
+        )
+    elif op == "rename_player":
+        player = player_id(conn, change.get("player", change.get("old")))
+        conn.execute(
+            "UPDATE players SET name = ? WHERE id = ?", (change["new"], player)
+        )
+    elif op == "deactivate":
+        conn.execute(
+            "INSERT INTO inactive_players (player_id) VALUES (?)",
+            (player_id(conn, change["player"]),),
+        )
+    elif op == "activate":
+        conn.execute(
+            "DELETE FROM inactive_players WHERE player_id = ?",
+            (player_id(conn, change["player"]),),
+        )
+    elif op == "add_fixture":
+        insert_fixture(conn, change["fixture"])
+    elif op == "edit_fixture":
+        field = change["field"]
+        if field not in FIXTURE_COLUMNS:
+            raise ValueError(f"Unknown fixture field: {field}")
+        conn.execute(
+            f"UPDATE fixtures SET {field} = ? WHERE id = ?",
+            (change["value"], change["match"]),
+        )
+    elif op == "delete_fixture":
+        for table in ("selections", "payments"):
+            conn.execute(f"DELETE FROM {table} WHERE match_id = ?", (change["match"],))
+        conn.execute("DELETE FROM fixtures WHERE id = ?", (change["match"],))
+    elif op == "select":
+        conn.execute(
+            "INSERT INTO selections (match_id, player_id) VALUES (?, ?)",
+            (change["match"], player_id(conn, change["player"])),
+        )
+    elif op == "deselect":
+        delete_first(conn, "selections", change["match"], change["player"])
+    elif op == "pay":
+        conn.execute(
+            "INSERT INTO payments (match_id, player_id, amount, method, time) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                change["match"],
+                player_id(conn, change["player"]),
+                change.get("amount"),
+                change.get("method"),
+                change.get("time"),
+            ),
+        )
+    else:
+        raise ValueError(f"Unknown change: {op}")
+
+    if "seq" in change:
+        conn.execute(
+            "INSERT OR REPLACE INTO club (key, value) VALUES ('journal_seq', ?)",
+            (str(change["seq"]),),
+        )
+
+
+def fees_due(conn):
+    """
+    Return (player, matches due, total due) for every player who owes
+    fees, worked out in SQL from the selections and payments tables.
+    """
+    return conn.execute(
+        """
+        SELECT pl.name, COUNT(*), ROUND(SUM(f.fee), 2)
+        FROM (SELECT DISTINCT match_id, player_id FROM selections) AS s
+        JOIN fixtures AS f ON f.id = s.match_id
+        JOIN players AS pl ON pl.id = s.player_id
+        WHERE NOT EXISTS (
+            SELECT 1 FROM payments AS p
+            WHERE p.match_id = s.match_id AND p.player_id = s.player_id
+        )
+        GROUP BY s.player_id
+        ORDER BY pl.name
+        """
+    ).fetchall()
+
+
+def migrate(json_path, db_path, journal_path=None):
+    """
+    Copy the club in json_path, its archived seasons and any journal
+    changes newer than it into the database at db_path.  A change that
+    can't be written is skipped with a warning, as run.replay_journal
+    does.  Returns the open connection.
+    """
+    snapshot = read_snapshot(json_path)
+    for season in snapshot.get("seasons", {}):
+        archived = read_snapshot(season_file(json_path, season))
+        snapshot["matches"] = archived["matches"] + snapshot["matches"]
+    conn = open_database(db_path)
+    write_club(conn, snapshot)
+    seq = snapshot.get("journal_seq", 0)
+    if journal_path:
+        for change in read_journal(journal_path):
+            if change.get("seq", 0) <= seq:
+                continue
+            try:
+                store_change(conn, change)
+            except (sqlite3.Error, KeyError, ValueError) as error:
+                print(
+                    f"⚠ Skipped journal change {change.get('seq')} "
+                    f"({change.get('op')}): {type(error).__name__} {error}"
+                )
+    return conn
+
+
+def main(argv):
+    json_path = argv[1] if len(argv) > 1 else "data.json"
+    db_path = argv[2] if len(argv) > 2 else "data.db"
+    journal_path = os.path.splitext(json_path)[0] + ".journal"
+
+    if not os.path.exists(json_path):
+        print(f"No club data found at {json_path}")
+        return 1
+    if os.path.exists(db_path):
+        confirm = input(f"{db_path} already exists. Replace it? (yes/no): ")
+        if confirm.strip().lower() != "yes":
+            print("Migration cancelled.")
+            return 1
+
+    conn = migrate(json_path, db_path, journal_path)
+    club = read_club(conn)
+    due = fees_due(conn)
+    conn.close()
+
+    print(f"✓ Copied {json_path} to {db_path}")
+    print(f"  Players: {len(club['players'])}")
+    print(f"  Fixtures: {len(club['matches'])}")
+    print(f"  Players owing fees: {len(due)}")
+    print(f"  Outstanding fees: £{sum(total for _, _, total in due):.2f}")
+    print("Set MATCH_FEES_STORAGE=sqlite to use the database.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
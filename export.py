@@ -0,0 +1,194 @@
+"""
+Report export for the match fees tracker.
+
+Streams player balances, per-match collection figures and payment rows
+to CSV, JSON or JSON lines, one row at a time.  Archived seasons are read
+from their files one season at a time and never loaded into the club, so
+memory use doesn't grow with the length of the club's history.
+
+    python batch.py export balances --output balances.csv
+    python batch.py export matches --format json
+    python batch.py export payments --output payments.jsonl
+"""
+
+import csv
+import json
+import sys
+from datetime import date, timedelta
+from itertools import islice
+
+import run
+from finance import fee_summary
+
+FIELDS = {
+    "balances": ["player", "status", "owed", "paid", "due", "unpaid_matches"],
+    "matches": [
+        "date",
+        "opponent",
+        "fee",
+        "players",
+        "paid_players",
+        "fees",
+        "collected",
+        "due",
+        "collection_rate",
+    ],
+    "payments": ["date", "opponent", "player", "amount", "method", "paid_at"],
+}
+
+# Match figures are worked out for this many matches at a time, so a long
+# history is still streamed rather than summed in one go
+SUMMARY_BATCH = 500
+
+
+def season_range(season):
+    """Return the first and last dates of a season."""
+    start = date(season, run.SEASON_START_MONTH, 1)
+    end = date(season + 1, run.SEASON_START_MONTH, 1) - timedelta(days=1)
+    return start, end
+
+
+def all_matches():
+    """
+    Yield every match the club has ever had in date order, reading
+    archived seasons from disk one at a time without loading them.
+    """
+    seasons = set(run.archived_seasons)
+    seasons.update(run.season_of(m["date"]) for m in run.get_matches_sorted())
+    for season in sorted(seasons):
+        if season in run.archived_seasons:
+            data = run.read_data_file(run.season_file(run.DATA_FILE, season))
+            if data is None:
+                print(f"⚠ Could not read the {season} season.", file=sys.stderr)
+                continue
+            season_matches = [run.match_from_json(m) for m in data["matches"]]
+            season_matches.sort(key=lambda m: (m["date"], m["id"]))
+            yield from season_matches
+        else:
+            yield from run.matches_between(*season_range(season))
+
+
+def balance_rows():
+    """Yield each player's all-time balance, in name order."""
+    for player in sorted(run.players):
+        entry = run.ledger.get(player, {"owed": 0, "paid": 0, "unpaid": 0})
+        yield {
+            "player": player,
+            "status": "active" if run.is_active(player) else "inactive",
+            "owed": entry["owed"] / 100,
+            "paid": entry["paid"] / 100,
+            "due": (entry["owed"] - entry["paid"]) / 100,
+            "unpaid_matches": entry["unpaid"],
+        }
+
+
+def match_bitsets(batch):
+    """
+    Return the team and paid bitsets of some matches, which may be from
+    an archived season and not loaded, numbering players as they appear.
+    """
+    numbers = {}
+    teams = []
+    paid = []
+    for match in batch:
+        for names, bitsets in ((match["players"], teams), (match["paid"], paid)):
+            bits = 0
+            for player in names:
+                bits |= 1 << numbers.setdefault(player, len(numbers))
+            bitsets.append(bits)
+    return teams, paid
+
+
+def match_rows():
+    """
+    Yield the fees and collection figures for every match, worked out in
+    pence by fee_summary() as on the Match Financial Report (so a player
+    who paid and was then dropped from the team doesn't count as paid).
+    """
+    history = all_matches()
+    while True:
+        batch = list(islice(history, SUMMARY_BATCH))
+        if not batch:
+            return
+        teams, paid = match_bitsets(batch)
+        figures = fee_summary([run.to_pence(m["fee"]) for m in batch], teams, paid)
+        for index, match in enumerate(batch):
+            rate = figures["collection_rate"][index]
+            yield {
+                "date": match["date"].isoformat(),
+                "opponent": match["opponent"],
+                "fee": match["fee"],
+                "players": figures["team"][index],
+                "paid_players": figures["paid_players"][index],
+                "fees": figures["fees"][index] / 100,
+                "collected": figures["collected"][index] / 100,
+                "due": figures["due"][index] / 100,
+                "collection_rate": None if rate is None else round(rate, 1),
+            }
+
+
+def payment_rows():
+    """
+    Yield one row for each payment, with how and when it was made (blank
+    for payments recorded before those were kept), e.g. to check against
+    card reader statements.
+    """
+    for match in all_matches():
+        for event in match["payments"]:
+            yield {
+                "date": match["date"].isoformat(),
+                "opponent": match["opponent"],
+                "player": event["player"],
+                "amount": event["amount"],
+                "method": event["method"],
+                "paid_at": event["time"],
+            }
+
+
+REPORTS = {
+    "balances": balance_rows,
+    "matches": match_rows,
+    "payments": payment_rows,
+}
+
+
+def write_csv(rows, fields, out):
+    writer = csv.DictWriter(out, fieldnames=fields)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_json(rows, fields, out):
+    """Write rows as a JSON list without holding the whole list in memory."""
+    count = 0
+    out.write("[")
+    for row in rows:
+        out.write(",\n  " if count else "\n  ")
+        out.write(json.dumps(row))
+        count += 1
+    out.write("\n]\n" if count else "]\n")
+    return count
+
+
+def write_json_lines(rows, fields, out):
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row) + "\n")
+        count += 1
+    return count
+
+
+WRITERS = {
+    "csv": write_csv,
+    "json": write_json,
+    "jsonl": write_json_lines,
+}
+
+
+def export_report(report, out, file_format="csv"):
+    """Stream a report ("balances", "matches" or "payments") to out."""
+    return WRITERS[file_format](REPORTS[report](), FIELDS[report], out)
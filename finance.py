@@ -0,0 +1,115 @@
+"""
+Fee figures for a set of matches, worked out in one go.
+
+The matches are laid out as a players x matches selection matrix, a paid
+matrix of the same shape and a fee vector, all in pence, so that player
+balances, match totals, collection rates and grand totals each come from
+a single matrix operation instead of a loop over every match and player.
+
+NumPy does the sums when it is installed.  Without it (or with
+MATCH_FEES_NUMPY=0) the same figures are counted straight from the
+bitsets, so NumPy is optional and the results are identical either way.
+"""
+
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+USE_NUMPY = numpy is not None and os.environ.get("MATCH_FEES_NUMPY", "1") != "0"
+
+
+def fee_summary(fees, selected, paid):
+    """
+    Return the fee figures for a set of matches.
+
+    fees holds each match's fee in pence; selected and paid hold, for the
+    same matches, bitsets of the player ids in the team and of those who
+    have paid (payments from players no longer in the team don't count).
+    The result has per-player lists indexed by player id ("owed", "paid"
+    in pence and "unpaid" match counts), per-match lists in the order
+    given ("team", "paid_players", "fees", "collected", "due" and
+    "collection_rate", a percentage or None for an empty team), and grand
+    totals under "total_fees", "total_collected", "total_due" and
+    "collection_rate_overall".
+    """
+    paid = [team & paid_bits for team, paid_bits in zip(selected, paid)]
+    if USE_NUMPY:
+        figures = numpy_figures(fees, selected, paid)
+    else:
+        figures = bitset_figures(fees, selected, paid)
+
+    total_fees = sum(figures["fees"])
+    total_collected = sum(figures["collected"])
+    figures["due"] = [f - c for f, c in zip(figures["fees"], figures["collected"])]
+    figures["collection_rate"] = [
+        collection_rate(c, f) for f, c in zip(figures["fees"], figures["collected"])
+    ]
+    figures["total_fees"] = total_fees
+    figures["total_collected"] = total_collected
+    figures["total_due"] = total_fees - total_collected
+    figures["collection_rate_overall"] = collection_rate(total_collected, total_fees)
+    return figures
+
+
+def collection_rate(collected, fees):
+    """Return collected as a percentage of fees (None if there are none)."""
+    return collected / fees * 100 if fees else None
+
+
+def bit_matrix(bitsets, width):
+    """Return a players x matches 0/1 matrix with one column per bitset."""
+    size = (width + 7) // 8
+    data = b"".join(bits.to_bytes(size, "little") for bits in bitsets)
+    rows = numpy.frombuffer(data, dtype=numpy.uint8).reshape(len(bitsets), size)
+    return numpy.unpackbits(rows, axis=1, bitorder="little")[:, :width].T
+
+
+def numpy_figures(fees, selected, paid):
+    width = max((team.bit_length() for team in selected), default=0)
+    fee_vector = numpy.array(fees, dtype=numpy.int64)
+    team = bit_matrix(selected, width).astype(numpy.int64)
+    settled = bit_matrix(paid, width).astype(numpy.int64)
+    team_sizes = team.sum(axis=0)
+    paid_counts = settled.sum(axis=0)
+    return {
+        "owed": (team @ fee_vector).tolist(),
+        "paid": (settled @ fee_vector).tolist(),
+        "unpaid": (team.sum(axis=1) - settled.sum(axis=1)).tolist(),
+        "team": team_sizes.tolist(),
+        "paid_players": paid_counts.tolist(),
+        "fees": (team_sizes * fee_vector).tolist(),
+        "collected": (paid_counts * fee_vector).tolist(),
+    }
+
+
+def bitset_figures(fees, selected, paid):
+    width = max((team.bit_length() for team in selected), default=0)
+    owed = [0] * width
+    paid_totals = [0] * width
+    unpaid = [0] * width
+    team_sizes = []
+    paid_counts = []
+    for fee, team, settled in zip(fees, selected, paid):
+        team_sizes.append(team.bit_count())
+        paid_counts.append(settled.bit_count())
+        digits = bin(team)[:1:-1]  # lowest bit (player id 0) first
+        player_id = digits.find("1")
+        while player_id != -1:
+            owed[player_id] += fee
+            if settled >> player_id & 1:
+                paid_totals[player_id] += fee
+            else:
+                unpaid[player_id] += 1
+            player_id = digits.find("1", player_id + 1)
+    return {
+        "owed": owed,
+        "paid": paid_totals,
+        "unpaid": unpaid,
+        "team": team_sizes,
+        "paid_players": paid_counts,
+        "fees": [n * fee for n, fee in zip(team_sizes, fees)],
+        "collected": [n * fee for n, fee in zip(paid_counts, fees)],
+    }
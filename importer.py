@@ -0,0 +1,147 @@
+"""
+Bulk import of players, fixtures and payments for the match fees tracker.
+
+Rows are read one at a time from a CSV file (with a header row), a JSON
+list or a JSON lines file, and checked with the same rules as the menus.
+Rows that fail are reported and skipped.  Run through batch.py, so the
+rows that are accepted are saved in one write:
+
+    python batch.py import players squad.csv          # name
+    python batch.py import fixtures league.csv        # opponent, date, fee
+    python batch.py import payments sumup.csv         # player, amount[, method]
+"""
+
+import csv
+import json
+import os
+
+import run
+
+# Columns each kind of file needs (matched case-insensitively)
+COLUMNS = {
+    "players": ("name",),
+    "fixtures": ("opponent", "date", "fee"),
+    "payments": ("player", "amount"),
+}
+
+
+def read_rows(path):
+    """
+    Yield (line number, row) for each row in a CSV, JSON or JSON lines
+    file, with lower-case column names.  A row that can't be read is
+    yielded as None.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        if extension == ".csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, lower_keys(row)
+        elif extension in (".jsonl", ".ndjson"):
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield number, lower_keys(json.loads(line))
+                except (ValueError, AttributeError):
+                    yield number, None
+        else:
+            for number, row in enumerate(json.load(f), 1):
+                yield number, lower_keys(row) if isinstance(row, dict) else None
+
+
+def lower_keys(row):
+    return {str(key).strip().lower(): value for key, value in row.items()}
+
+
+def text(row, column):
+    """Return a column as stripped text ("" if missing)."""
+    value = row.get(column)
+    return "" if value is None else str(value).strip()
+
+
+def parse_amount(value):
+    """Turn "£1,250.00" or 1250 into a float (ValueError if not a number)."""
+    cleaned = str(value).replace("£", "").replace(",", "").strip()
+    try:
+        return float(cleaned)
+    except ValueError:
+        raise ValueError(f"Invalid amount: {value}")
+
+
+def parse_method(value):
+    """Turn "Card" or "bank transfer" into a payment method key."""
+    cleaned = str(value).strip().lower()
+    for method, label in run.PAYMENT_METHODS.items():
+        if cleaned in (method, label.lower()):
+            return method
+    raise ValueError(f"Unknown payment method: {value}")
+
+
+def import_player(row, known, options):
+    name = run.smart_title(text(row, "name"))
+    if not name:
+        raise ValueError("Player name cannot be empty")
+    if any(ch.isdigit() for ch in name):
+        raise ValueError(f"Player name cannot contain numbers: {name}")
+    if name in known:
+        raise ValueError(f"{name} already exists in the player list")
+    run.create_player(name)
+    known.add(name)
+
+
+def import_fixture(row, known, options):
+    opponent = run.smart_title(text(row, "opponent"))
+    if not opponent:
+        raise ValueError("Opponent cannot be empty")
+    match_date = run.parse_match_date(text(row, "date"))
+    fee = run.parse_fee(parse_amount(row.get("fee")))
+    if not options["allow_duplicates"] and run.find_fixtures(match_date, opponent):
+        raise ValueError(
+            f"Already have {opponent} on {match_date.strftime('%d/%m/%Y')}"
+        )
+    run.create_fixture(opponent, match_date, fee)
+
+
+def import_payment(row, known, options):
+    name = text(row, "player")
+    player = name if name in known else run.smart_title(name)
+    if player not in known:
+        raise ValueError(f"Unknown player: {name}")
+    method = parse_method(text(row, "method")) if text(row, "method") else None
+    run.pay_player_fees(
+        player, parse_amount(row.get("amount")), method or options["method"]
+    )
+
+
+IMPORTERS = {
+    "players": import_player,
+    "fixtures": import_fixture,
+    "payments": import_payment,
+}
+
+
+def import_rows(kind, rows, allow_duplicates=False, method="cash"):
+    """
+    Apply (line number, row) pairs of the given kind ("players",
+    "fixtures" or "payments") to the club.  Yields (line number, None)
+    for each row imported and (line number, reason) for each rejected.
+    Payments without a method column are recorded as method.
+    """
+    importer = IMPORTERS[kind]
+    options = {"allow_duplicates": allow_duplicates, "method": method}
+    known = set(run.players)
+    for number, row in rows:
+        if row is None:
+            yield number, "Not a valid row"
+            continue
+        missing = [column for column in COLUMNS[kind] if column not in row]
+        if missing:
+            yield number, f"Missing {', '.join(missing)}"
+            continue
+        try:
+            importer(row, known, options)
+        except ValueError as error:
+            yield number, str(error)
+            continue
+        yield number, None
@@ -0,0 +1,140 @@
+"""
+Paged, searchable pickers for the match fees tracker's long lists.
+
+A picker shows a numbered list a page at a time.  At its prompt "n" and
+"p" move between pages and typing part of a name (or "/" and the text,
+for a name that is also a command) shows only the entries whose name has
+a word starting with it, or failing that containing it.  Searches are a
+binary search in a sorted index of the names' words, so typing a few
+letters gives a short list however big the club is.  Numbers always
+refer to the full list, so the same answer picks the same entry whether
+or not the list was paged or searched.
+"""
+
+import bisect
+
+from table import PAGING, column_lines, fit_columns, interactive, terminal_size
+
+
+def name_index(names):
+    """
+    Return sorted (key, position) pairs for names: a name's key is
+    itself in lower case, then the same from each later word, so
+    "Hugo Keenan" is found from "hu" and from "kee".
+    """
+    index = []
+    for position, name in enumerate(names):
+        words = name.lower().split()
+        for start in range(len(words)):
+            index.append((" ".join(words[start:]), position))
+    index.sort()
+    return index
+
+
+def search_names(index, names, text):
+    """
+    Return the positions (in list order) of the names with a word that
+    starts with text, or if there are none the names that contain it.
+    """
+    text = " ".join(text.lower().split())
+    found = set()
+    at = bisect.bisect_left(index, (text,))
+    while at < len(index) and index[at][0].startswith(text):
+        found.add(index[at][1])
+        at += 1
+    if not found:
+        found = {
+            position for position, name in enumerate(names) if text in name.lower()
+        }
+    return sorted(found)
+
+
+class Picker:
+    """
+    A numbered list of cells (one per name, cell_width wide, laid out as
+    by table.column_lines under header) to choose from by number.
+    reserved holds the answers that are the caller's commands rather
+    than searches, such as "b" and "all".
+    """
+
+    def __init__(self, names, cells, cell_width, header, reserved=(), reserve=4):
+        self.names = names
+        self.cells = cells
+        self.cell_width = cell_width
+        self.header = header
+        self.reserved = set(reserved)
+        self.reserve = reserve  # lines kept free below the list
+        self.index = None  # built on the first search
+        self.shown = list(range(len(cells)))
+        self.search = ""
+        self.start = 0
+
+    def page_size(self):
+        """Return how many entries fit on a page."""
+        if not PAGING or not interactive():
+            return max(1, len(self.cells))
+        # rules, header and the "Showing" line take 5 lines
+        rows = max(5, terminal_size()[1] - self.reserve - 5)
+        return rows * fit_columns(self.cell_width, 2)
+
+    def show(self):
+        """Print the current page (and where it is in the list)."""
+        size = self.page_size()
+        page = self.shown[self.start : self.start + size]
+        cells = [self.cells[position] for position in page]
+        print("\n".join(column_lines(cells, self.cell_width, self.header)))
+        if self.search:
+            print(
+                f"Showing {self.start + 1}-{self.start + len(page)} of "
+                f"{len(self.shown)} matching '{self.search}' (/ to show all)"
+            )
+        elif len(self.shown) > size:
+            print(
+                f"Showing {self.start + 1}-{self.start + len(page)} of "
+                f"{len(self.shown)} (n/p for next/previous page, or type a name)"
+            )
+
+    def find(self, text):
+        """Show only the entries matching text (all of them if it's blank)."""
+        text = text.strip()
+        if not text:
+            self.shown = list(range(len(self.cells)))
+        else:
+            if self.index is None:
+                self.index = name_index(self.names)
+            found = search_names(self.index, self.names, text)
+            if not found:
+                print(f"⚠ Nothing matches '{text}'")
+                return
+            self.shown = found
+        self.search = text
+        self.start = 0
+        self.show()
+
+    def turn(self, step):
+        """Show the next (step 1) or previous (step -1) page, wrapping round."""
+        size = self.page_size()
+        last = (len(self.shown) - 1) // size * size
+        self.start += step * size
+        if self.start > last:
+            self.start = 0
+        elif self.start < 0:
+            self.start = last
+        self.show()
+
+    def ask(self, prompt):
+        """
+        Return the next answer to prompt that isn't a page turn or a
+        search, stripped: a number, a command or a blank line.
+        """
+        while True:
+            answer = input(prompt).strip()
+            command = answer.lower()
+            if command in ("n", "p") and len(self.shown) > self.page_size():
+                self.turn(1 if command == "n" else -1)
+            elif answer.startswith("/"):
+                self.find(answer[1:])
+            elif command not in self.reserved and any(ch.isalpha() for ch in answer):
+                self.find(answer)
+            else:
+                return answer
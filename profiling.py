@@ -0,0 +1,155 @@
+"""
+Opt-in timing for the match fees tracker.
+
+Set MATCH_FEES_PROFILE to record the wall time and number of calls of
+loading, saving, sorting fixtures and each kind of change, and how long
+each menu screen takes to show (the work between one prompt and the
+next, not the time spent waiting for the user).  A summary is shown when
+the program exits:
+
+    MATCH_FEES_PROFILE=1 python run.py              # summary on stderr
+    MATCH_FEES_PROFILE=timings.txt python run.py    # summary written to a file
+    MATCH_FEES_PROFILE=run.prof python run.py       # also a cProfile file
+    python -m pstats run.prof                       # to look through it
+
+When the variable isn't set the decorators here hand back the functions
+they are given unchanged, so they cost nothing.  Screen timings assume
+one session at a time (run.py, not server.py).
+"""
+
+import atexit
+import builtins
+import cProfile
+import functools
+import os
+import sys
+import time
+
+PROFILE = os.environ.get("MATCH_FEES_PROFILE", "").strip()
+ENABLED = PROFILE.lower() not in ("", "0", "no", "off")
+PROFILE_EXTENSIONS = (".prof", ".pstats")
+ON_VALUES = ("1", "yes", "on", "true")  # summary on stderr, not to a file
+
+timings = {}  # name -> [calls, total seconds, longest call in seconds]
+screens = []  # menu screens being shown, innermost last
+shown_at = None  # when the user last answered a prompt
+profiler = None
+started = False
+
+
+def add_timing(name, seconds):
+    entry = timings.setdefault(name, [0, 0.0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+    entry[2] = max(entry[2], seconds)
+
+
+def timed_by(key):
+    """
+    Decorator that times each call under "name" (the function's name),
+    or "name: key(*args)" if key is given.
+    """
+
+    def decorate(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            name = function.__name__
+            if key is not None:
+                name = f"{name}: {key(*args, **kwargs)}"
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                add_timing(name, time.perf_counter() - start)
+
+        return wrapper
+
+    return decorate
+
+
+timed = timed_by(None)
+
+
+def screen_timed(function):
+    """
+    Decorator for a menu screen: the time from each answer to the next
+    prompt while this is the innermost screen counts as one showing of it.
+    """
+    if not ENABLED:
+        return function
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        screens.append(function.__name__)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            screens.pop()
+
+    return wrapper
+
+
+real_input = builtins.input
+
+
+def timed_input(prompt=""):
+    """input() that charges the time since the last answer to the screen."""
+    global shown_at
+    if screens and shown_at is not None:
+        add_timing(f"screen {screens[-1]}", time.perf_counter() - shown_at)
+    try:
+        return real_input(prompt)
+    finally:
+        shown_at = time.perf_counter()
+
+
+def summary_lines():
+    """Return the timings as a table, slowest in total first."""
+    lines = [
+        f"{'Timing':<44} {'Calls':>7} {'Total ms':>10} {'Mean ms':>9} "
+        f"{'Max ms':>9}",
+        "-" * 83,
+    ]
+    for name, (calls, total, longest) in sorted(
+        timings.items(), key=lambda item: -item[1][1]
+    ):
+        lines.append(
+            f"{name[:44]:<44} {calls:>7} {total * 1000:>10.2f} "
+            f"{total / calls * 1000:>9.3f} {longest * 1000:>9.2f}"
+        )
+    return lines
+
+
+def report():
+    """Show (or write) the summary and save the cProfile data, if any."""
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(PROFILE)
+    text = "\n".join(["", "=== Timings ==="] + summary_lines()) + "\n"
+    if profiler is not None or PROFILE.lower() in ON_VALUES:
+        sys.__stderr__.write(text)
+        if profiler is not None:
+            sys.__stderr__.write(f"cProfile data saved to {PROFILE}\n")
+        return
+    try:
+        with open(PROFILE, "w") as f:
+            f.write(text)
+    except OSError as error:
+        sys.__stderr__.write(f"⚠ Could not write timings to {PROFILE}: {error}\n")
+        sys.__stderr__.write(text)
+
+
+def start_profiling():
+    """Start recording if MATCH_FEES_PROFILE is set; report at exit."""
+    global profiler, started
+    if not ENABLED or started:
+        return
+    started = True
+    builtins.input = timed_input
+    if PROFILE.lower().endswith(PROFILE_EXTENSIONS):
+        profiler = cProfile.Profile()
+        profiler.enable()
+    atexit.register(report)
@@ -0,0 +1,319 @@
+"""
+Headless replays of menu sessions for the match fees tracker.
+
+A session file holds the keystrokes of one visit to the menus, one line
+per prompt, exactly as typed (a blank line is just Enter).  The sessions
+are fed into run.main() with input and output redirected, against a
+made-up club (see bench.py) or a copy of a real data.json, and the time
+each screen took to appear after a key was pressed is recorded.
+
+    python replay.py --record pay.txt                  # use the menus, keep the keys
+    python replay.py pay.txt fixtures.txt --repeat 500 --players 2000
+    python replay.py sessions/*.txt --club data.json --transcript out.txt
+
+The report lists each screen with how often it was shown and how long it
+took, and the slowest actions (a key pressed on a screen).
+"""
+
+import argparse
+import glob
+import os
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import traceback
+
+import bench
+import run
+from profiling import start_profiling
+
+HEADER = re.compile(r"^=== (.+?) ===$", re.MULTILINE)
+
+
+class SessionEnded(BaseException):
+    """Raised in run.main() when a session has no more keystrokes."""
+
+
+def screen_name(text, previous):
+    """
+    Return a name for the screen in some output: its first "=== Title ==="
+    header (without any "(12 matches)" count), else the prompt it ends
+    with, else previous.
+    """
+    header = HEADER.search(text)
+    if header:
+        return re.sub(r"\s*\(.*\)$", "", header.group(1))
+    lines = text.rstrip("\n").splitlines()
+    if lines and lines[-1].strip():
+        return lines[-1].strip()
+    return previous
+
+
+class Replay:
+    """
+    Stand-in for sys.stdin and sys.stdout while a session runs: each line
+    read is the next keystroke, and the time from one key to the next
+    prompt is kept with the screen it produced.
+    """
+
+    def __init__(self, keys, transcript=None):
+        self.keys = iter(keys)
+        self.transcript = transcript
+        self.output = []
+        self.screen = "start"
+        self.action = "start"
+        self.timings = []  # (action, screen shown, seconds, bytes of output)
+        self.started = time.perf_counter()
+
+    def write(self, text):
+        self.output.append(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+    def screen_done(self):
+        """Record the output since the last key as the screen it produced."""
+        seconds = time.perf_counter() - self.started
+        text = "".join(self.output)
+        self.output = []
+        if self.transcript:
+            self.transcript.write(text)
+        self.screen = screen_name(text, self.screen)
+        self.timings.append((self.action, self.screen, seconds, len(text.encode())))
+
+    def readline(self):
+        self.screen_done()
+        key = next(self.keys, None)
+        if key is None:
+            raise SessionEnded()
+        if self.transcript:
+            self.transcript.write(key + "\n")
+        self.action = f"{self.screen} > {key.strip() or 'Enter'}"
+        self.started = time.perf_counter()
+        return key + "\n"
+
+
+def replay_session(keys, transcript=None):
+    """
+    Run the menus on a list of keystrokes and return the timings (see
+    Replay) and whether the session ran without an error.
+    """
+    replay = Replay(keys, transcript)
+    stdin, stdout = sys.stdin, sys.stdout
+    sys.stdin = sys.stdout = replay
+    completed = True
+    try:
+        run.main()
+        replay.screen_done()
+    except SessionEnded:
+        pass
+    except Exception:
+        completed = False
+        sys.stdin, sys.stdout = stdin, stdout
+        print(f"⚠ Session failed after {replay.action}:", file=sys.stderr)
+        traceback.print_exc()
+    finally:
+        sys.stdin, sys.stdout = stdin, stdout
+    return replay.timings, completed
+
+
+def read_session(path):
+    """Return the keystrokes in a session file."""
+    with open(path, "r") as f:
+        return f.read().splitlines()
+
+
+class Recorder:
+    """Stand-in for sys.stdin that keeps a copy of every line typed."""
+
+    def __init__(self, stream, out):
+        self.stream = stream
+        self.out = out
+
+    def isatty(self):
+        return self.stream.isatty()
+
+    def readline(self):
+        line = self.stream.readline()
+        if line:
+            self.out.write(line if line.endswith("\n") else line + "\n")
+            self.out.flush()
+        return line
+
+
+def record_session(path):
+    """Run the menus normally, saving each line typed to path."""
+    with open(path, "w") as out:
+        stdin = sys.stdin
+        sys.stdin = Recorder(stdin, out)
+        try:
+            run.main()
+        except (EOFError, KeyboardInterrupt):
+            pass
+        finally:
+            sys.stdin = stdin
+    print(f"✓ Session saved to {path}")
+
+
+def start_club(options, snapshot):
+    """
+    Put a fresh copy of the club in the current folder and load it: the
+    files saved with options.club, or else snapshot (a made-up club).
+    """
+    run.wait_for_compaction()
+    for path in glob.glob("data*"):
+        os.remove(path)
+    if snapshot is not None:
+        run.load_snapshot(snapshot)
+        run.save_data()
+        return
+    # club.json comes with club.json.1 backups and club.season-2024.json
+    # files (and data.json with data.journal), copied under run.py's names
+    folder, base = os.path.split(options.club)
+    stem = base[: -len(".json")]
+    for path in glob.glob(os.path.join(folder, glob.escape(stem) + ".*")):
+        name = "data" + os.path.basename(path)[len(stem) :]
+        if not name.endswith(".db"):
+            shutil.copy(path, name)
+    run.load_data()
+
+
+def percentile(values, share):
+    """Return the value share (0 to 1) of the way up the sorted values."""
+    ordered = sorted(values)
+    return ordered[round(share * (len(ordered) - 1))]
+
+
+def report_lines(timings, seconds, runs, failed, top):
+    """Return the screen and action tables for all the timings."""
+    screens = {}
+    actions = {}
+    for action, screen, took, size in timings:
+        screens.setdefault(screen, []).append((took, size))
+        actions.setdefault(action, []).append(took)
+
+    lines = [
+        f"Replayed {runs} session(s) ({failed} failed), {len(timings)} screens "
+        f"in {seconds:.2f} s ({len(timings) / seconds:.0f} screens/s)",
+        "",
+        f"{'Screen':<40} {'Shown':>6} {'Mean ms':>8} {'95% ms':>8} "
+        f"{'Max ms':>8} {'Mean KB':>8}",
+        "-" * 83,
+    ]
+    by_total = sorted(screens.items(), key=lambda item: -sum(t for t, _ in item[1]))
+    for screen, shown in by_total[:top]:
+        took = [t * 1000 for t, _ in shown]
+        size = statistics.mean(s for _, s in shown) / 1024
+        lines.append(
+            f"{screen[:40]:<40} {len(shown):>6} {statistics.mean(took):>8.2f} "
+            f"{percentile(took, 0.95):>8.2f} {max(took):>8.2f} {size:>8.1f}"
+        )
+
+    lines += [
+        "",
+        f"{'Slowest actions':<58} {'Count':>6} {'Mean ms':>8} {'Max ms':>8}",
+        "-" * 83,
+    ]
+    by_mean = sorted(actions.items(), key=lambda item: -statistics.mean(item[1]))
+    for action, took in by_mean[:top]:
+        lines.append(
+            f"{action[:58]:<58} {len(took):>6} "
+            f"{statistics.mean(took) * 1000:>8.2f} {max(took) * 1000:>8.2f}"
+        )
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded menu sessions and time each screen."
+    )
+    parser.add_argument("sessions", nargs="*", help="session files to replay")
+    parser.add_argument("--record", help="use the menus and save the keys to FILE")
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="times to replay each session"
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="start every session from the same club (default: changes carry on)",
+    )
+    parser.add_argument("--club", help="replay against a copy of this data.json")
+    bench.add_club_options(parser)
+    parser.add_argument("--top", type=int, default=15, help="rows in each table")
+    parser.add_argument("--transcript", help="write everything shown to FILE")
+    parser.add_argument("--output", help="also write the report to this file")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    options = parser.parse_args(argv)
+    if not options.sessions and not options.record:
+        parser.print_help()
+        return 2
+    if not bench.club_options_valid(options):
+        return 2
+    if options.club and not options.club.endswith(".json"):
+        print("⚠ --club must be a data .json file")
+        return 2
+    if options.club and not os.path.exists(options.club):
+        print(f"⚠ {options.club} not found")
+        return 2
+    sessions = []
+    for path in options.sessions:
+        try:
+            sessions.append((path, read_session(path)))
+        except OSError as error:
+            print(f"⚠ Could not read {path}: {error}")
+            return 2
+    if options.club:
+        options.club = os.path.abspath(options.club)
+    record = os.path.abspath(options.record) if options.record else None
+    transcript = open(options.transcript, "w") if options.transcript else None
+
+    start_profiling()
+    here = os.getcwd()
+    timings = []
+    runs = failed = 0
+    with tempfile.TemporaryDirectory(prefix="match-fees-replay-") as folder:
+        os.chdir(folder)
+        try:
+            snapshot = None if options.club else bench.synthetic_club(options)
+            start_club(options, snapshot)
+            if record:
+                record_session(record)
+            start = time.perf_counter()
+            for _ in range(options.repeat):
+                for path, keys in sessions:
+                    if options.fresh:
+                        start_club(options, snapshot)
+                    session_timings, completed = replay_session(keys, transcript)
+                    timings += session_timings
+                    runs += 1
+                    failed += not completed
+            seconds = time.perf_counter() - start
+            run.wait_for_compaction()
+        finally:
+            os.chdir(here)
+            if transcript:
+                transcript.close()
+
+    if not timings:
+        return 0
+    lines = report_lines(timings, seconds, runs, failed, options.top)
+    print("\n".join(lines))
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
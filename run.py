@@ -1,22 +1,152 @@
-from datetime import datetime, date
-import json
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+import glob
+import io
+import math
 import os
+import signal
+import sqlite3
+import sys
+import threading
+
+from data import (
+    append_journal,
+    backup_paths,
+    lock_file,
+    read_journal,
+    read_snapshot,
+    remove_files,
+    season_file,
+    trim_journal,
+    write_snapshot,
+)
+from database import (
+    has_club,
+    open_database,
+    read_club,
+    store_change,
+    store_changes,
+    write_club,
+)
+from finance import fee_summary
+from picker import Picker
+from profiling import screen_timed, start_profiling, timed, timed_by
+from table import column_lines, row_formats, show, side_by_side, split_columns
 
 DATA_FILE = "data.json"
+JOURNAL_FILE = "data.journal"
+# Journal changes that could not be replayed are kept here to look at by hand
+SKIPPED_FILE = "data.journal.skipped"
+# Only the process holding this file may change the club, so two sessions
+# never number their journal changes from the same seq.  Terminals share a
+# club through server.py instead.
+LOCK_FILE = "data.lock"
+
+# Changes are appended to JOURNAL_FILE instead of rewriting DATA_FILE each
+# time; the journal is folded back into DATA_FILE every so many changes.
+# Set MATCH_FEES_JOURNAL=0 to go back to saving the whole file every change.
+JOURNAL_ENABLED = os.environ.get("MATCH_FEES_JOURNAL", "1") != "0"
+JOURNAL_COMPACT_EVERY = 200
+
+# Number of previous copies of DATA_FILE kept as data.json.1, data.json.2 ...
+DATA_BACKUPS = int(os.environ.get("MATCH_FEES_BACKUPS", "3"))
+
+# Set MATCH_FEES_STORAGE=sqlite to keep the club in DATABASE_FILE instead,
+# with each change saved as its own small transaction.  The first run
+# copies DATA_FILE (if there is one) into the new database.
+STORAGE = os.environ.get("MATCH_FEES_STORAGE", "json").strip().lower()
+DATABASE_FILE = "data.db"
+
+# Matches from seasons before the current one are kept in their own files
+# and only loaded when a screen needs them.  Seasons start on the first of
+# this month (1 for calendar-year seasons, 9 for September to August).
+SEASON_START_MONTH = int(os.environ.get("MATCH_FEES_SEASON_START", "1"))
+
+# On a terminal each screen is sent in one write when the next prompt is
+# shown, instead of a write per printed line (set MATCH_FEES_BUFFER_OUTPUT=0
+# to turn this off).  Screens bigger than this many bytes take more writes.
+BUFFER_OUTPUT = os.environ.get("MATCH_FEES_BUFFER_OUTPUT", "1") != "0"
+OUTPUT_BUFFER_SIZE = 64 * 1024
 
 
 players = []
 matches = []
 inactive_players = []
 
+# Every player has a stable id.  Saved data (snapshots, season files, the
+# journal and the database) refers to players by id, so renaming a player
+# only changes their entry here.
+player_names = {}  # id -> name
+player_ids = {}  # name -> id
+next_player_id = 1
+
+next_match_id = 1
+journal_seq = 0  # seq of the last change applied to the club
+journal_pending = 0  # changes appended since the journal was last compacted
+compaction_thread = None
+change_batch = None  # changes made inside batched_changes(), saved at the end
+database = None  # open connection when STORAGE is "sqlite"
+club_lock = None  # LOCK_FILE, open while this process holds it
+
+# Seasons still on disk: season -> {"ids": match ids, "balances": {player
+# id: [owed, paid, unpaid matches]}}, so all-time balances stay right
+# without reading the season's matches.
+archived_seasons = {}
+
+# Lookup indexes kept in step with players/matches by apply_change(), so
+# screens never have to scan every match to answer "who played where".
+# Teams and payments are bitsets held in Python ints: bit n of a match's
+# entry is the player with id n and bit n of a player's entry is match n,
+# so e.g. the unpaid players of a match are selected & ~paid.
+matches_by_id = {}
+active_bits = 0  # players not marked inactive
+player_selected = {}  # player -> matches they are selected for
+player_paid = {}  # player -> matches they have paid for
+match_selected = {}  # match id -> players selected for it
+match_paid = {}  # match id -> players who have paid for it
+
+# Payment events (each match keeps its own in match["payments"]) indexed by
+# player and by the day the money was taken, as (match, event) pairs
+player_payments = {}
+payments_by_day = {}
+
+PAYMENT_METHODS = {"cash": "Cash", "card": "Card", "transfer": "Bank transfer"}
+
+# Running fee balances per player, in pence so repeated updates never drift.
+# "owed" is the fees for every match a player is selected for, "paid" the
+# part of that they have paid and "unpaid" the number of matches still due.
+ledger = {}
+outstanding_pence = 0
+
+# Fixtures in date order: fixture_keys holds (date, id) for each entry of
+# fixtures_by_date so date windows can be found with a binary search.
+fixture_keys = []
+fixtures_by_date = []
+sorted_view = None  # cached tuple of fixtures_by_date, reset on any change
+
+# Fixtures by exact day and by (day, opponent_key(opponent)), for duplicate
+# and clash checks that don't depend on how many fixtures the club has
+fixtures_by_day = {}
+fixtures_by_key = {}
+
+# Timings and failures of data file writes, shown under Club management
+save_stats = {
+    "saves": 0,
+    "failures": 0,
+    "last_seconds": 0.0,
+    "total_seconds": 0.0,
+    "last_error": "",
+}
+
 
 def create_demo_data():
     """Create demo data for Heroku deployment when no data.json exists"""
-    global club_name, players, matches, inactive_players
+    global club_name, matches, inactive_players
 
     club_name = "Demo Rugby Club"
 
-    players = [
+    demo_players = [
         "Antoine Dupont",
         "Ardie Savea",
         "Ben Earl",
@@ -38,6 +168,7 @@ def create_demo_data():
         "Will Jordan",
         "Will Skelton",
     ]
+    load_players(demo_players)
 
     inactive_players = ["Owen Farrell"]  # Making one player inactive for demo
 
@@ -89,6 +220,9 @@ def create_demo_data():
             "paid": [],
         },
     ]
+    for match in matches:
+        match["payments"] = legacy_payments(match)
+    number_matches()
 
 
 def smart_title(text: str) -> str:
@@ -109,69 +243,1383 @@ def smart_title(text: str) -> str:
     return " ".join(result)
 
 
+@timed
 def get_matches_sorted():
-    return sorted(matches, key=lambda m: m["date"])
+    """Return all matches in date order (a cached, read-only tuple)."""
+    global sorted_view
+    if sorted_view is None:
+        sorted_view = tuple(fixtures_by_date)
+    return sorted_view
+
+
+def matches_between(start_date=None, end_date=None):
+    """Return matches dated from start_date to end_date inclusive, in order."""
+    lo = 0
+    hi = len(fixture_keys)
+    if start_date is not None:
+        lo = bisect_left(fixture_keys, (start_date,))
+    if end_date is not None:
+        hi = bisect_right(fixture_keys, (end_date, float("inf")))
+    return fixtures_by_date[lo:hi]
+
+
+# Named date windows as (days back, days ahead) of today; None leaves that
+# side of the window open.
+DATE_WINDOWS = {
+    "recent": (14, 14),
+    "last_month": (30, 0),
+    "next_month": (0, 30),
+    "upcoming": (0, None),
+    "all": (None, None),
+}
+
+# The standard "Show matches" filter menu: (choice, label, window)
+MATCH_FILTERS = [
+    ("1", "Recent + upcoming (last 2 weeks + next 2 weeks)", "recent"),
+    ("2", "Last month's matches", "last_month"),
+    ("3", "Next month's matches", "next_month"),
+    ("4", "All matches", "all"),
+]
+
+
+def date_window(name, today=None):
+    """Return the (start, end) dates of a named window around today."""
+    if today is None:
+        today = datetime.now().date()
+    days_back, days_ahead = DATE_WINDOWS[name]
+    start_date = None if days_back is None else today - timedelta(days=days_back)
+    end_date = None if days_ahead is None else today + timedelta(days=days_ahead)
+    return start_date, end_date
 
 
-def save_data():
-    data = {
-        "club_name": club_name,
-        "players": players,
-        "inactive_players": inactive_players,
-        "matches": [
-            {
-                "opponent": m["opponent"],
-                "date": m["date"].isoformat(),
-                "fee": m["fee"],
-                "players": m["players"],
-                "paid": m["paid"],
-            }
-            for m in matches
+def query_matches(start_date=None, end_date=None, where=()):
+    """
+    Return matches between two dates (either may be None) in date order.
+    where is a list of conditions, e.g. [has_outstanding_fees], that every
+    returned match must satisfy.
+    """
+    load_seasons_between(start_date, end_date)
+    if start_date is None and end_date is None:
+        found = get_matches_sorted()
+    else:
+        found = matches_between(start_date, end_date)
+    for condition in where:
+        found = [m for m in found if condition(m)]
+    return list(found)
+
+
+def window_matches(name, where=(), today=None):
+    """Return the matches in a named date window, e.g. "recent"."""
+    start_date, end_date = date_window(name, today)
+    return query_matches(start_date, end_date, where)
+
+
+def has_outstanding_fees(match):
+    """Return True if anyone selected for the match has not paid."""
+    match_id = match["id"]
+    return bool(match_selected[match_id] & ~match_paid[match_id])
+
+
+# Filters on the "Fees Due Per Match" screen: choice -> (window, conditions)
+FEES_DUE_FILTERS = {
+    "1": ("upcoming", ()),
+    "2": ("recent", ()),
+    "3": ("all", (has_outstanding_fees,)),
+    "4": ("all", ()),
+}
+
+
+def choose_filtered_matches(title, back_label="Back to main menu"):
+    """
+    Show the "Show matches" filter menu until a filter finds some matches.
+    Returns the matches in date order, or None if the user goes back.
+    """
+    choices = [choice for choice, _, _ in MATCH_FILTERS]
+    while True:
+        print(f"\n=== {title} ===")
+        print("Show matches:")
+        for choice, label, _ in MATCH_FILTERS:
+            print(f"{choice}) {label}")
+        print(f"b) {back_label}")
+        print()
+
+        filter_choice = input("Choose filter: ").strip().lower()
+        if filter_choice == "b":
+            return None
+        if filter_choice not in choices:
+            print(f"Please enter {', '.join(choices)}, or b")
+            continue
+
+        window = MATCH_FILTERS[choices.index(filter_choice)][2]
+        filtered_matches = window_matches(window)
+        if filtered_matches:
+            return filtered_matches
+
+        print("\nNo matches found for the selected period. Try a different filter.")
+
+
+def opponent_key(opponent):
+    """Return an opponent name as compared for duplicates ("old  boys" = "Old Boys")."""
+    return " ".join(opponent.split()).casefold()
+
+
+def add_to_date_index(match):
+    """Insert a match into the date-ordered fixture index."""
+    global sorted_view
+    key = (match["date"], match["id"])
+    position = bisect_left(fixture_keys, key)
+    fixture_keys.insert(position, key)
+    fixtures_by_date.insert(position, match)
+    sorted_view = None
+    add_to_day_index(match)
+
+
+def remove_from_date_index(match):
+    """Take a match out of the date-ordered fixture index."""
+    global sorted_view
+    position = bisect_left(fixture_keys, (match["date"], match["id"]))
+    del fixture_keys[position]
+    del fixtures_by_date[position]
+    sorted_view = None
+    remove_from_day_index(match)
+
+
+def add_to_day_index(match):
+    """File a match under its day and its (day, opponent) key."""
+    fixtures_by_day.setdefault(match["date"], []).append(match)
+    key = (match["date"], opponent_key(match["opponent"]))
+    fixtures_by_key.setdefault(key, []).append(match)
+
+
+def remove_from_day_index(match):
+    """Take a match out of the day and (day, opponent) indexes."""
+    for index, key in (
+        (fixtures_by_day, match["date"]),
+        (fixtures_by_key, (match["date"], opponent_key(match["opponent"]))),
+    ):
+        index[key] = [m for m in index[key] if m is not match]
+        if not index[key]:
+            del index[key]
+
+
+def number_matches():
+    """Give every match without an id the next free match id."""
+    global next_match_id
+    for match in matches:
+        if "id" in match:
+            next_match_id = max(next_match_id, match["id"] + 1)
+    for match in matches:
+        if "id" not in match:
+            match["id"] = next_match_id
+            next_match_id += 1
+
+
+def find_match(match_id):
+    """Return the match with the given id, loading its season if needed."""
+    if match_id not in matches_by_id:
+        for season, summary in list(archived_seasons.items()):
+            if match_id in summary["ids"]:
+                load_season(season)
+                break
+    return matches_by_id[match_id]
+
+
+def to_pence(amount):
+    """Convert a fee in pounds to whole pence (0 for a broken inf or nan)."""
+    if not math.isfinite(amount):
+        return 0
+    return round(amount * 100)
+
+
+def ledger_entry(player):
+    """Return the running balance for a player, creating it if needed."""
+    if player not in ledger:
+        ledger[player] = {"owed": 0, "paid": 0, "unpaid": 0}
+    return ledger[player]
+
+
+def ledger_adjust(player, match, sign):
+    """Add (sign 1) or take away (sign -1) a match fee from a player's balance."""
+    global outstanding_pence
+    entry = ledger_entry(player)
+    fee = to_pence(match["fee"])
+    entry["owed"] += sign * fee
+    if match_paid[match["id"]] & player_bit(player):
+        entry["paid"] += sign * fee
+    else:
+        entry["unpaid"] += sign
+        outstanding_pence += sign * fee
+
+
+def ledger_pay(player, match):
+    """Move a selected player's fee for a match from due to paid."""
+    global outstanding_pence
+    if not match_selected[match["id"]] & player_bit(player):
+        return
+    entry = ledger_entry(player)
+    fee = to_pence(match["fee"])
+    entry["paid"] += fee
+    entry["unpaid"] -= 1
+    outstanding_pence -= fee
+
+
+def index_match(match):
+    """Add a match and its team and payments to the indexes."""
+    index_team(match)
+    match_bit = 1 << match["id"]
+    for player in match["players"]:
+        player_selected[player] = player_selected.get(player, 0) | match_bit
+    for player in match["paid"]:
+        player_paid[player] = player_paid.get(player, 0) | match_bit
+
+
+def index_team(match):
+    """Add a match, its team and payments to every index but the players'."""
+    match_id = match["id"]
+    matches_by_id[match_id] = match
+    match_selected[match_id] = match_paid[match_id] = 0
+    for player in match["players"]:
+        match_selected[match_id] |= player_bit(player)
+    for player in match["paid"]:
+        match_paid[match_id] |= player_bit(player)
+    for player in dict.fromkeys(match["players"]):
+        ledger_adjust(player, match, 1)
+    for event in match["payments"]:
+        index_payment(match, event)
+
+
+def payment_day(match, event):
+    """Return the day a payment was taken (the match date if not known)."""
+    if event["time"]:
+        return parse_iso_date(event["time"][:10])
+    return match["date"]
+
+
+def index_payment(match, event):
+    """Add a payment event to the player and day indexes."""
+    player_payments.setdefault(event["player"], []).append((match, event))
+    payments_by_day.setdefault(payment_day(match, event), []).append((match, event))
+
+
+def unindex_payment(match, event):
+    """Remove a payment event from the player and day indexes."""
+    player_payments[event["player"]].remove((match, event))
+    day = payment_day(match, event)
+    payments_by_day[day].remove((match, event))
+    if not payments_by_day[day]:
+        del payments_by_day[day]
+
+
+def unindex_match(match):
+    """Remove a match and its team and payments from the indexes."""
+    match_id = match["id"]
+    for player in bit_players(match_selected[match_id]):
+        ledger_adjust(player, match, -1)
+    for event in match["payments"]:
+        unindex_payment(match, event)
+    remove_from_date_index(match)
+    for player in bit_players(match_selected.pop(match_id)):
+        player_selected[player] &= ~(1 << match_id)
+    for player in bit_players(match_paid.pop(match_id)):
+        player_paid[player] &= ~(1 << match_id)
+    del matches_by_id[match_id]
+
+
+@timed
+def rebuild_indexes():
+    """Rebuild every lookup index from players, matches and inactive_players."""
+    global active_bits, outstanding_pence, sorted_view
+    outstanding_pence = 0
+    sorted_view = None
+    for index in (
+        ledger,
+        fixture_keys,
+        fixtures_by_date,
+        fixtures_by_day,
+        fixtures_by_key,
+        matches_by_id,
+        player_selected,
+        player_paid,
+        match_selected,
+        match_paid,
+        player_payments,
+        payments_by_day,
+    ):
+        index.clear()
+    active_bits = 0
+    for player in players:
+        active_bits |= player_bit(player)
+        player_selected[player] = 0
+        player_paid[player] = 0
+        ledger_entry(player)
+    for player in inactive_players:
+        active_bits &= ~player_bit(player)
+    # Each player's bitsets are built once rather than one match at a time
+    selected_ids = {}
+    paid_ids = {}
+    for match in matches:
+        index_team(match)
+        for player in match["players"]:
+            selected_ids.setdefault(player, []).append(match["id"])
+        for player in match["paid"]:
+            paid_ids.setdefault(player, []).append(match["id"])
+    for player, match_ids in selected_ids.items():
+        player_selected[player] = bits_of(match_ids)
+    for player, match_ids in paid_ids.items():
+        player_paid[player] = bits_of(match_ids)
+    fixtures_by_date.extend(sorted(matches, key=lambda m: (m["date"], m["id"])))
+    fixture_keys.extend((m["date"], m["id"]) for m in fixtures_by_date)
+    for match in fixtures_by_date:
+        add_to_day_index(match)
+    for summary in archived_seasons.values():
+        ledger_archive(summary, 1)
+
+
+def season_of(match_date):
+    """Return the season (the year it starts in) a date falls in."""
+    if match_date.month >= SEASON_START_MONTH:
+        return match_date.year
+    return match_date.year - 1
+
+
+def season_summary(season_matches):
+    """
+    Return the match ids, balances and takings ({day: {method: pence}})
+    kept for an archived season.
+    """
+    balances = {}
+    takings = {}
+    for match in season_matches:
+        for event in match.get("payments", []):
+            day = takings.setdefault((event["time"] or match["date"])[:10], {})
+            method = event["method"] or "unknown"
+            day[method] = day.get(method, 0) + to_pence(event["amount"])
+        fee = to_pence(match["fee"])
+        paid = set(match["paid"])
+        for player in set(match["players"]) | paid:
+            balances.setdefault(player, [0, 0, 0])
+        for player in set(match["players"]):
+            balance = balances[player]
+            balance[0] += fee
+            if player in paid:
+                balance[1] += fee
+            else:
+                balance[2] += 1
+    return {
+        "ids": [match["id"] for match in season_matches],
+        "balances": balances,
+        "takings": takings,
+        "by_id": True,  # the season file refers to players by id
+    }
+
+
+def ledger_archive(summary, sign):
+    """Add (sign 1) or take away (sign -1) an archived season's balances."""
+    global outstanding_pence
+    for player, (owed, paid, unpaid) in summary["balances"].items():
+        entry = ledger_entry(player_name(player))
+        entry["owed"] += sign * owed
+        entry["paid"] += sign * paid
+        entry["unpaid"] += sign * unpaid
+        outstanding_pence += sign * (owed - paid)
+
+
+@timed
+def load_season(season):
+    """Read an archived season's matches into the club."""
+    if season not in archived_seasons:
+        return
+    data = read_data_file(season_file(DATA_FILE, season))
+    if data is None:
+        print(f"⚠ Could not load the {season} season.")
+        return
+    ledger_archive(archived_seasons.pop(season), -1)
+    for m in data.get("matches", []):
+        match = match_from_json(m)
+        adopt_unknown_players(match)
+        matches.append(match)
+        index_match(match)
+        add_to_date_index(match)
+
+
+def load_seasons_between(start_date=None, end_date=None):
+    """Load every archived season that overlaps the given dates."""
+    for season in sorted(archived_seasons):
+        if start_date is not None and season < season_of(start_date):
+            continue
+        if end_date is not None and season > season_of(end_date):
+            continue
+        load_season(season)
+
+
+def load_player_seasons(player, unpaid_only=False):
+    """Load the archived seasons a player was picked or paid in."""
+    for season, summary in sorted(archived_seasons.items()):
+        balance = summary["balances"].get(player_ref(player))
+        if balance is not None and (balance[2] or not unpaid_only):
+            load_season(season)
+
+
+def register_player(name, player_id=None):
+    """Give a player name an id (the next free one unless given)."""
+    global next_player_id
+    if player_id is None:
+        player_id = next_player_id
+    player_names[player_id] = name
+    player_ids[name] = player_id
+    next_player_id = max(next_player_id, player_id + 1)
+    return player_id
+
+
+def load_players(entries):
+    """
+    Replace the player list and ids with saved entries: {"id", "name"}
+    dicts, or plain names in files saved before players had ids.
+    """
+    global next_player_id
+    player_names.clear()
+    player_ids.clear()
+    next_player_id = 1
+    players[:] = []
+    for entry in entries:
+        if isinstance(entry, dict):
+            register_player(entry["name"], int(entry["id"]))
+            players.append(entry["name"])
+        else:
+            register_player(entry)
+            players.append(entry)
+
+
+def adopt_player(name):
+    """
+    Add a name that saved data uses but the player list lacks (which
+    older files allowed) as an inactive player.
+    """
+    print(f"⚠ {name} was missing from the player list; added as inactive.")
+    register_player(name)
+    players.append(name)
+    inactive_players.append(name)
+    player_selected.setdefault(name, 0)
+    player_paid.setdefault(name, 0)
+    ledger_entry(name)
+
+
+def adopt_unknown_players(match):
+    """Adopt anyone a match's team or payments name who isn't a player."""
+    names = match["players"] + match["paid"]
+    names += [event["player"] for event in match["payments"]]
+    for name in dict.fromkeys(names):
+        if name not in player_ids:
+            adopt_player(name)
+
+
+def player_ref(name):
+    """Return how saved data refers to a player: by id if they have one."""
+    return player_ids.get(name, name)
+
+
+def player_name(ref):
+    """Return the player a saved reference means (an id, or an old name)."""
+    return player_names[ref] if isinstance(ref, int) else ref
+
+
+def player_bit(player):
+    """Return the bit that stands for a player in a match's bitsets."""
+    return 1 << player_ids[player]
+
+
+def set_bits(bits):
+    """Return the positions of the bits set in bits, lowest first."""
+    digits = bin(bits)[:1:-1]  # lowest bit first
+    if bits.bit_count() * 8 > len(digits):
+        return [i for i, digit in enumerate(digits) if digit == "1"]
+    # Few bits set: jump from one to the next
+    positions = []
+    position = digits.find("1")
+    while position != -1:
+        positions.append(position)
+        position = digits.find("1", position + 1)
+    return positions
+
+
+def bits_of(positions):
+    """Return a bitset with the bits at the given positions set."""
+    positions = list(positions)
+    if not positions:
+        return 0
+    flags = bytearray(max(positions) // 8 + 1)
+    for position in positions:
+        flags[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(flags, "little")
+
+
+def bit_players(bits):
+    """Return the players in a bitset, in roster order (the order of ids)."""
+    return [player_names[player_id] for player_id in set_bits(bits)]
+
+
+def is_active(player):
+    """Return True if the player is not marked inactive."""
+    return bool(active_bits & player_bit(player))
+
+
+def active_count():
+    """Return how many players are active."""
+    return active_bits.bit_count()
+
+
+def get_active_players():
+    """Return the active players in roster order."""
+    return bit_players(active_bits)
+
+
+def is_selected(match, player):
+    """Return True if the player is in the match team."""
+    return bool(match_selected[match["id"]] & player_bit(player))
+
+
+def available_players(match):
+    """Return active players not yet selected for the match."""
+    return bit_players(active_bits & ~match_selected[match["id"]])
+
+
+def available_count(match):
+    """Return how many active players are not selected for the match."""
+    return (active_bits & ~match_selected[match["id"]]).bit_count()
+
+
+def selected_active_players(some_matches):
+    """Return the active players selected for any of the matches, sorted."""
+    selected = 0
+    for match in some_matches:
+        selected |= match_selected[match["id"]]
+    return sorted(bit_players(selected & active_bits))
+
+
+def unpaid_players(match):
+    """Return the selected players who have not paid, in team order."""
+    paid = match_paid[match["id"]]
+    return [p for p in match["players"] if not paid & player_bit(p)]
+
+
+def player_balance_due(player):
+    """Return the fees a player still owes."""
+    entry = ledger.get(player)
+    if entry is None:
+        return 0
+    return (entry["owed"] - entry["paid"]) / 100
+
+
+def total_outstanding_fees():
+    """Return the fees still owed by all players."""
+    return outstanding_pence / 100
+
+
+def players_owing():
+    """Return (player, balance due) for every player who owes fees, by name."""
+    result = []
+    for player in sorted(players):
+        balance_due = player_balance_due(player)
+        if balance_due > 0:
+            result.append((player, balance_due))
+    return result
+
+
+def players_with_fees_due():
+    """
+    Return (player, matches due, total due) for every active player
+    who owes fees, in name order.
+    """
+    result = []
+    for player in sorted(players):
+        entry = ledger.get(player)
+        if entry is None or not entry["unpaid"] or not is_active(player):
+            continue
+        result.append((player, entry["unpaid"], player_balance_due(player)))
+    return result
+
+
+def match_fee_summary(some_matches):
+    """Return the fee_summary() figures (in pence) for some loaded matches."""
+    return fee_summary(
+        [to_pence(match["fee"]) for match in some_matches],
+        [match_selected[match["id"]] for match in some_matches],
+        [match_paid[match["id"]] for match in some_matches],
+    )
+
+
+def player_unpaid_matches(player):
+    """Return the matches a player still owes for, oldest first."""
+    load_player_seasons(player, unpaid_only=True)
+    unpaid = player_selected.get(player, 0) & ~player_paid.get(player, 0)
+    return sorted(
+        (matches_by_id[i] for i in set_bits(unpaid)),
+        key=lambda m: (m["date"], m["id"]),
+    )
+
+
+def takings_by_day(start_date=None, end_date=None):
+    """
+    Return (day, {method: amount}) for each day money was taken between
+    start_date and end_date, oldest first.  Archived seasons are counted
+    from their saved totals without being loaded.
+    """
+    totals = {}
+
+    def add(day, method, pence):
+        if start_date is not None and day < start_date:
+            return
+        if end_date is not None and day > end_date:
+            return
+        day_totals = totals.setdefault(day, {})
+        day_totals[method] = day_totals.get(method, 0) + pence
+
+    for summary in archived_seasons.values():
+        for day, by_method in summary.get("takings", {}).items():
+            for method, pence in by_method.items():
+                add(parse_iso_date(day), method, pence)
+    for day, payments in payments_by_day.items():
+        for match, event in payments:
+            add(day, event["method"] or "unknown", to_pence(event["amount"]))
+    return [
+        (day, {method: pence / 100 for method, pence in totals[day].items()})
+        for day in sorted(totals)
+    ]
+
+
+def match_to_json(match):
+    """Return a JSON-ready copy of a match."""
+    return {
+        "id": match["id"],
+        "opponent": match["opponent"],
+        "date": match["date"].isoformat(),
+        "fee": match["fee"],
+        "players": [player_ref(p) for p in match["players"]],
+        "paid": [player_ref(p) for p in match["paid"]],
+        "payments": [
+            dict(event, player=player_ref(event["player"]))
+            for event in match["payments"]
         ],
     }
+
+
+def parse_iso_date(text):
+    """Turn a YYYY-MM-DD string into a date."""
+    return date.fromisoformat(text)
+
+
+def match_from_json(m):
+    """Build a match from its JSON form."""
+    match = {
+        "opponent": m["opponent"],
+        "date": parse_iso_date(m["date"]),
+        "fee": float(m["fee"]),
+        "players": [player_name(p) for p in m.get("players", [])],
+        "paid": [player_name(p) for p in m.get("paid", [])],
+    }
+    if "payments" in m:
+        match["payments"] = [
+            payment_event(**dict(event, player=player_name(event["player"])))
+            for event in m["payments"]
+        ]
+    else:
+        match["payments"] = legacy_payments(match)
+    if "id" in m:
+        match["id"] = int(m["id"])
+    return match
+
+
+def payment_event(player, amount, method=None, time=None):
+    """Return a payment event: who paid how much, how and when."""
+    return {"player": player, "amount": float(amount), "method": method, "time": time}
+
+
+def legacy_payments(match):
+    """
+    Return payment events for a match saved before payments were logged:
+    the full fee for each name on its paid list, method and time unknown.
+    """
+    return [payment_event(player, match["fee"]) for player in match["paid"]]
+
+
+def build_snapshot():
+    """Return a JSON-ready copy of the whole club."""
+    return {
+        "club_name": club_name,
+        "players": [{"id": player_ids[p], "name": p} for p in players],
+        "inactive_players": [player_ref(p) for p in inactive_players],
+        "journal_seq": journal_seq,
+        "matches": [match_to_json(m) for m in matches],
+        "seasons": {str(s): summary for s, summary in archived_seasons.items()},
+    }
+
+
+def split_seasons(snapshot):
+    """
+    Move matches from before the current season out of a snapshot.
+    Returns the snapshot and {season: matches} for the season files.
+    """
+    current = season_of(datetime.now().date())
+    kept = []
+    past = {}
+    for m in snapshot["matches"]:
+        season = season_of(parse_iso_date(m["date"]))
+        if season < current:
+            past.setdefault(season, []).append(m)
+        else:
+            kept.append(m)
+    seasons = dict(snapshot["seasons"])
+    for season, season_matches in past.items():
+        seasons[str(season)] = season_summary(season_matches)
+    return dict(snapshot, matches=kept, seasons=seasons), past
+
+
+def write_compacted(snapshot):
+    """
+    Write a snapshot and drop the journal changes it includes.
+    Returns True if the data file was written.
+    """
     try:
-        with open(DATA_FILE, "w") as f:
-            json.dump(data, f, indent=2)
-    except Exception:
-        pass
+        if STORAGE == "sqlite":
+            seconds = write_club(database, snapshot)
+        else:
+            snapshot, past = split_seasons(snapshot)
+            seconds = 0.0
+            for season, season_matches in past.items():
+                seconds += write_snapshot(
+                    season_file(DATA_FILE, season),
+                    {"season": season, "matches": season_matches},
+                    backups=DATA_BACKUPS,
+                )
+            seconds += write_snapshot(DATA_FILE, snapshot, backups=DATA_BACKUPS)
+            trim_journal(JOURNAL_FILE, snapshot["journal_seq"])
+    except Exception as error:
+        save_stats["failures"] += 1
+        save_stats["last_error"] = str(error)
+        path = DATABASE_FILE if STORAGE == "sqlite" else DATA_FILE
+        print(f"\n⚠ Could not save club data to {path}: {error}")
+        return False
 
+    save_stats["saves"] += 1
+    save_stats["last_seconds"] = seconds
+    save_stats["total_seconds"] += seconds
+    return True
 
-def load_data():
-    global club_name
-    if not os.path.exists(DATA_FILE):
-        create_demo_data()
+
+def wait_for_compaction():
+    """Block until any background compaction has finished."""
+    if compaction_thread is not None:
+        compaction_thread.join()
+
+
+@timed
+def save_data():
+    """
+    Write the whole club to DATA_FILE (or DATABASE_FILE) and clear the
+    journal.
+    Returns True if the data file was written.
+    """
+    global journal_pending
+    wait_for_compaction()
+    saved = write_compacted(build_snapshot())
+    if saved:
+        journal_pending = 0
+    return saved
+
+
+def compact_journal():
+    """Fold the journal into DATA_FILE on a background thread."""
+    global journal_pending, compaction_thread
+    if compaction_thread is not None and compaction_thread.is_alive():
+        return
+    journal_pending = 0
+    # The snapshot is copied here so the main thread can keep changing
+    # the club while the copy is written out.
+    compaction_thread = threading.Thread(
+        target=write_compacted, args=(build_snapshot(),)
+    )
+    compaction_thread.start()
+
+
+def apply_change(change):
+    """Apply one change (live or replayed from the journal) to the club."""
+    global active_bits, club_name, next_match_id
+    op = change["op"]
+
+    if op == "club_name":
+        club_name = change["name"]
+    elif op == "add_player":
+        player = change["player"]
+        register_player(player, change.get("id"))
+        players.append(player)
+        active_bits |= player_bit(player)
+        player_selected.setdefault(player, 0)
+        player_paid.setdefault(player, 0)
+        ledger_entry(player)
+    elif op == "rename_player":
+        if "player" in change:
+            old_name = player_name(change["player"])
+        else:
+            old_name = change["old"]  # journalled before players had ids
+        new_name = change["new"]
+        player_id = player_ids[old_name]
+        # Seasons archived before players had ids name them in their files
+        for season, summary in sorted(archived_seasons.items()):
+            if not summary.get("by_id") and player_id in summary["balances"]:
+                load_season(season)
+        del player_ids[old_name]
+        player_names[player_id] = new_name
+        player_ids[new_name] = player_id
+        players[players.index(old_name)] = new_name
+        if old_name in inactive_players:
+            inactive_players[inactive_players.index(old_name)] = new_name
+        selected_ids = player_selected.pop(old_name, 0)
+        paid_ids = player_paid.pop(old_name, 0)
+        player_selected[new_name] = selected_ids
+        player_paid[new_name] = paid_ids
+        ledger[new_name] = ledger.pop(old_name, {"owed": 0, "paid": 0, "unpaid": 0})
+        # The bitsets go by id; only the name lists of this player's
+        # matches need rewriting
+        for match_id in set_bits(selected_ids):
+            match = matches_by_id[match_id]
+            match["players"] = [
+                new_name if p == old_name else p for p in match["players"]
+            ]
+        for match_id in set_bits(paid_ids):
+            match = matches_by_id[match_id]
+            match["paid"] = [new_name if p == old_name else p for p in match["paid"]]
+        payments = player_payments.pop(old_name, [])
+        for match, event in payments:
+            event["player"] = new_name
+        player_payments[new_name] = payments
+    elif op == "deactivate":
+        player = player_name(change["player"])
+        inactive_players.append(player)
+        active_bits &= ~player_bit(player)
+    elif op == "activate":
+        player = player_name(change["player"])
+        inactive_players.remove(player)
+        active_bits |= player_bit(player)
+    elif op == "add_fixture":
+        match = match_from_json(change["fixture"])
+        load_seasons_between(match["date"], match["date"])
+        matches.append(match)
+        index_match(match)
+        add_to_date_index(match)
+        next_match_id = max(next_match_id, match["id"] + 1)
+    elif op == "edit_fixture":
+        match = find_match(change["match"])
+        field, value = change["field"], change["value"]
+        if field == "date":
+            # Re-file the match under its new date
+            new_date = parse_iso_date(value)
+            load_seasons_between(new_date, new_date)
+            remove_from_date_index(match)
+            match["date"] = new_date
+            add_to_date_index(match)
+        elif field == "opponent":
+            remove_from_day_index(match)
+            match["opponent"] = value
+            add_to_day_index(match)
+        elif field == "fee":
+            # Re-price the balance of everyone picked for this match
+            team = bit_players(match_selected[match["id"]])
+            for player in team:
+                ledger_adjust(player, match, -1)
+            match["fee"] = value
+            for player in team:
+                ledger_adjust(player, match, 1)
+        else:
+            match[field] = value
+    elif op == "delete_fixture":
+        match = find_match(change["match"])
+        unindex_match(match)
+        matches.remove(match)
+    elif op == "select":
+        match_id, player = change["match"], player_name(change["player"])
+        match = find_match(match_id)
+        match["players"].append(player)
+        if not match_selected[match_id] & player_bit(player):
+            match_selected[match_id] |= player_bit(player)
+            ledger_adjust(player, match, 1)
+        player_selected[player] = player_selected.get(player, 0) | 1 << match_id
+    elif op == "deselect":
+        match_id, player = change["match"], player_name(change["player"])
+        match = find_match(match_id)
+        match["players"].remove(player)
+        if player not in match["players"]:
+            ledger_adjust(player, match, -1)
+            match_selected[match_id] &= ~player_bit(player)
+            player_selected[player] &= ~(1 << match_id)
+    elif op == "pay":
+        match_id, player = change["match"], player_name(change["player"])
+        match = find_match(match_id)
+        match["paid"].append(player)
+        if not match_paid[match_id] & player_bit(player):
+            ledger_pay(player, match)
+            match_paid[match_id] |= player_bit(player)
+        player_paid[player] = player_paid.get(player, 0) | 1 << match_id
+        # Payments journalled before events were logged carry no details
+        event = payment_event(
+            player,
+            change.get("amount", match["fee"]),
+            change.get("method"),
+            change.get("time"),
+        )
+        match["payments"].append(event)
+        index_payment(match, event)
+    else:
+        raise ValueError(f"Unknown change: {op}")
+
+
+class ClubChanged(Exception):
+    """
+    Raised instead of making a change that no longer fits the club: the
+    fixture or player it is for was changed by another session (see
+    server.py) since the screen making it was shown.
+    """
+
+
+def check_change(change):
+    """Raise ClubChanged if the fixture or player a change is for has gone."""
+    op = change["op"]
+    if "match" in change:
+        try:
+            match = find_match(change["match"])
+        except KeyError:
+            raise ClubChanged("That fixture no longer exists") from None
+    if "player" in change and op != "add_player":
+        ref = change["player"]
+        if ref not in player_names and ref not in player_ids:
+            raise ClubChanged(f"{ref} has been renamed")
+        player = player_name(ref)
+    if op == "add_player" and change["player"] in player_ids:
+        raise ClubChanged(f"{change['player']} already exists")
+    elif op == "rename_player" and change["new"] in player_ids.keys() - {player}:
+        raise ClubChanged(f"{change['new']} already exists")
+    elif op == "deactivate" and player in inactive_players:
+        raise ClubChanged(f"{player} is already inactive")
+    elif op == "activate" and player not in inactive_players:
+        raise ClubChanged(f"{player} is already active")
+    elif op == "select" and is_selected(match, player):
+        raise ClubChanged(f"{player} is already in that team")
+    elif op == "deselect" and not is_selected(match, player):
+        raise ClubChanged(f"{player} is no longer in that team")
+    elif op == "pay" and match_paid[match["id"]] & player_bit(player):
+        raise ClubChanged(f"{player} has already paid for that fixture")
+
+
+@timed_by(lambda change: change["op"])
+def record_change(change):
+    """Apply a change to the club and append it to the journal."""
+    global journal_seq, journal_pending
+    check_change(change)
+    apply_change(change)
+    journal_seq += 1
+
+    if change_batch is not None:
+        change["seq"] = journal_seq
+        change_batch.append(change)
+        return
+
+    if STORAGE == "sqlite":
+        change["seq"] = journal_seq
+        try:
+            store_change(database, change)
+        except sqlite3.Error as error:
+            print(f"\n⚠ Could not save change to {DATABASE_FILE}: {error}")
+            save_data()
         return
 
+    if not JOURNAL_ENABLED:
+        save_data()
+        return
+
+    change["seq"] = journal_seq
     try:
-        with open(DATA_FILE, "r") as f:
-            data = json.load(f)
-    except Exception:
+        append_journal(JOURNAL_FILE, change)
+    except Exception as error:
+        print(f"\n⚠ Could not write to {JOURNAL_FILE}: {error}")
+        save_data()
         return
 
+    journal_pending += 1
+    if journal_pending >= JOURNAL_COMPACT_EVERY:
+        compact_journal()
+
+
+@contextmanager
+def batched_changes():
+    """
+    Save the changes made inside the block once, at the end, instead of
+    one at a time.  Nothing is saved if the block raises an exception.
+    """
+    global change_batch
+    change_batch = []
+    try:
+        yield
+        batch = change_batch
+    finally:
+        change_batch = None
+    if not batch:
+        return
+    if STORAGE == "sqlite":
+        try:
+            store_changes(database, batch)
+            return
+        except sqlite3.Error as error:
+            print(f"\n⚠ Could not save changes to {DATABASE_FILE}: {error}")
+    save_data()
+
+
+def replay_journal():
+    """
+    Apply journal changes newer than the loaded snapshot.  A change that
+    can't be applied is skipped with a warning, and replaying stops at
+    the first gap in the seqs (an older backup was loaded under a journal
+    that had already been trimmed), since later changes build on the
+    missing ones.  Changes not applied are copied to SKIPPED_FILE and the
+    club is saved straight away, so new changes don't reuse their seqs.
+    """
+    global journal_seq, journal_pending
+    skipped = []
+    stopped = False
+    for change in read_journal(JOURNAL_FILE):
+        seq = change.get("seq", 0)
+        if stopped:
+            skipped.append(change)
+            continue
+        if seq <= journal_seq:
+            continue
+        if seq != journal_seq + 1:
+            print(
+                f"⚠ Journal is missing the changes after {journal_seq}; "
+                f"not replaying change {seq} or any after it"
+            )
+            stopped = True
+            skipped.append(change)
+            continue
+        try:
+            apply_change(change)
+        except (KeyError, ValueError) as error:
+            print(
+                f"⚠ Skipped journal change {seq} ({change.get('op')}): "
+                f"{type(error).__name__} {error}"
+            )
+            skipped.append(change)
+            # It may have been partly applied
+            rebuild_indexes()
+        journal_seq = seq
+        journal_pending += 1
+
+    if not skipped:
+        return
+    journal_seq = max([journal_seq] + [c.get("seq", 0) for c in skipped])
+    for change in skipped:
+        append_journal(SKIPPED_FILE, change)
+    print(f"⚠ {len(skipped)} journal change(s) not applied, kept in {SKIPPED_FILE}")
+    save_data()
+
+
+def read_data_file(data_path=DATA_FILE):
+    """
+    Read a data file (DATA_FILE or a season file), falling back to the
+    newest readable backup if the file itself is damaged.  Returns None
+    if nothing can be read.
+    """
+    for path in [data_path] + backup_paths(data_path, DATA_BACKUPS):
+        if not os.path.exists(path):
+            continue
+        try:
+            data = read_snapshot(path)
+        except Exception as error:
+            print(f"⚠ Could not read {path}: {error}")
+            continue
+        if path != data_path:
+            print(f"⚠ Loaded club data from backup {path}")
+        return data
+    return None
+
+
+def claim_club():
+    """
+    Take LOCK_FILE for this process, or stop if another session (run.py,
+    batch.py or server.py) has the club open.
+    """
+    global club_lock
+    path = os.path.abspath(LOCK_FILE)
+    if club_lock is not None and club_lock.name == path:
+        return
+    lock = lock_file(path)
+    if lock is None:
+        raise SystemExit(
+            "⚠ The club is open in another session. "
+            "Use server.py to share it between terminals."
+        )
+    if club_lock is not None:
+        club_lock.close()
+    club_lock = lock
+
+
+@timed
+def load_data(claim=True):
+    global journal_pending
+    if claim:
+        claim_club()
+    journal_pending = 0
+    if STORAGE == "sqlite":
+        load_database()
+    else:
+        load_json_files()
+
+
+def load_json_files():
+    """
+    Load the club from DATA_FILE and replay the journal on top of it.
+    Returns False if DATA_FILE and its backups can't be read.
+    """
+    if not os.path.exists(DATA_FILE):
+        create_demo_data()
+        rebuild_indexes()
+        replay_journal()
+        return True
+
+    data = read_data_file()
+    if data is None:
+        print(f"⚠ No readable club data found in {DATA_FILE} or its backups.")
+        return False
+
+    load_snapshot(data)
+    replay_journal()
+    return True
+
+
+def load_database():
+    """
+    Load the club from DATABASE_FILE.  A new database is filled from
+    DATA_FILE and its journal (or the demo data) the first time.
+    """
+    global database
+    if database is None:
+        database = open_database(DATABASE_FILE)
+    if has_club(database):
+        load_snapshot(read_club(database))
+        return
+
+    if not load_json_files():
+        # Copying now would save an empty club over the unreadable one
+        raise SystemExit(
+            f"⚠ Not copying the club to {DATABASE_FILE} until {DATA_FILE} is fixed."
+        )
+    load_seasons_between()
+    if write_compacted(build_snapshot()) and os.path.exists(DATA_FILE):
+        print(f"✓ Copied club data from {DATA_FILE} to {DATABASE_FILE}")
+
+
+def load_snapshot(data):
+    """Replace the club with the contents of a snapshot."""
+    global club_name, journal_seq, next_match_id
     club_name = data.get("club_name", "")
-    players[:] = data.get("players", [])
-    inactive_players[:] = data.get("inactive_players", [])
+    journal_seq = data.get("journal_seq", 0)
+    load_players(data.get("players", []))
+    inactive_players[:] = []
+    for name in map(player_name, data.get("inactive_players", [])):
+        if name in player_ids:
+            inactive_players.append(name)
+        else:
+            adopt_player(name)
     matches[:] = []
+    archived_seasons.clear()
+    for season, summary in data.get("seasons", {}).items():
+        # JSON keys are strings: ids come back as digits, older files use names
+        for key in summary["balances"]:
+            if not str(key).isdigit() and key not in player_ids:
+                adopt_player(key)
+        summary["balances"] = {
+            int(key) if str(key).isdigit() else player_ref(key): balance
+            for key, balance in summary["balances"].items()
+        }
+        archived_seasons[int(season)] = summary
+        next_match_id = max([next_match_id] + [i + 1 for i in summary["ids"]])
 
     for m in data.get("matches", []):
         try:
-            y, mm, dd = map(int, m["date"].split("-"))
-            matches.append(
-                {
-                    "opponent": m["opponent"],
-                    "date": date(y, mm, dd),
-                    "fee": float(m["fee"]),
-                    "players": m.get("players", []),
-                    "paid": m.get("paid", []),
-                }
-            )
+            matches.append(match_from_json(m))
         except Exception:
             continue
+    for match in matches:
+        adopt_unknown_players(match)
+
+    number_matches()
+    rebuild_indexes()
+
+
+def set_club_name(name):
+    """Change the club name."""
+    record_change({"op": "club_name", "name": name})
+
+
+def create_player(name):
+    """Add a new player to the club."""
+    record_change({"op": "add_player", "id": next_player_id, "player": name})
+
+
+def rename_player(old_name, new_name):
+    """Rename a player everywhere they appear."""
+    record_change(
+        {"op": "rename_player", "player": player_ids[old_name], "new": new_name}
+    )
+
+
+def deactivate_player(player):
+    """Mark a player as inactive."""
+    record_change({"op": "deactivate", "player": player_ref(player)})
+
+
+def activate_player(player):
+    """Mark an inactive player as active again."""
+    record_change({"op": "activate", "player": player_ref(player)})
+
+
+def create_fixture(opponent, match_date, fee):
+    """Add a new fixture and return it."""
+    fixture = {
+        "id": next_match_id,
+        "opponent": opponent,
+        "date": match_date.isoformat(),
+        "fee": fee,
+        "players": [],
+        "paid": [],
+        "payments": [],
+    }
+    record_change({"op": "add_fixture", "fixture": fixture})
+    return matches[-1]
+
+
+def update_fixture(match, field, value):
+    """Change the date, opponent or fee of a fixture."""
+    if field == "date":
+        value = value.isoformat()
+    record_change(
+        {"op": "edit_fixture", "match": match["id"], "field": field, "value": value}
+    )
+
+
+def delete_fixture(match):
+    """Remove a fixture."""
+    record_change({"op": "delete_fixture", "match": match["id"]})
+
+
+def select_player(match, player):
+    """Add a player to a match team."""
+    record_change({"op": "select", "match": match["id"], "player": player_ref(player)})
+
+
+def deselect_player(match, player):
+    """Remove a player from a match team."""
+    record_change(
+        {"op": "deselect", "match": match["id"], "player": player_ref(player)}
+    )
+
+
+def mark_paid(match, player, method="cash"):
+    """Record that a player has paid the fee for a match, and how."""
+    record_change(
+        {
+            "op": "pay",
+            "match": match["id"],
+            "player": player_ref(player),
+            "amount": match["fee"],
+            "method": method,
+            "time": datetime.now().isoformat(timespec="seconds"),
+        }
+    )
+
+
+def parse_fee(value):
+    """Turn "10" or 10.0 into a fee in pounds (ValueError if not £0 or more)."""
+    fee = float(value)
+    if not math.isfinite(fee) or fee < 0:
+        raise ValueError(f"Invalid fee: {value}")
+    return fee
+
+
+def parse_match_date(text):
+    """Turn a DD/MM/YY or DD/MM/YYYY string into a date (ValueError if not)."""
+    for date_format in ("%d/%m/%y", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid date: {text}")
+
+
+def find_fixtures(match_date, opponent):
+    """Return the fixtures against opponent on match_date."""
+    load_seasons_between(match_date, match_date)
+    return list(fixtures_by_key.get((match_date, opponent_key(opponent)), ()))
+
+
+def fixtures_on(match_date, exclude=None):
+    """Return the fixtures on match_date (other than exclude), in id order."""
+    load_seasons_between(match_date, match_date)
+    return sorted(
+        (m for m in fixtures_by_day.get(match_date, ()) if m is not exclude),
+        key=lambda m: m["id"],
+    )
+
+
+def clash_warning(match_date, exclude=None):
+    """Print a note if the club already plays someone else on match_date."""
+    others = fixtures_on(match_date, exclude)
+    if others:
+        opponents = ", ".join(m["opponent"] for m in others)
+        print(
+            f"\n⚠ Note: {club_name} already play {opponents} on "
+            f"{match_date.strftime('%d/%m/%Y')}"
+        )
+
+
+def full_match_allocation(unpaid_matches, amount):
+    """
+    Return the oldest unpaid matches that amount pays for in full, and
+    their total fee.  Only whole match fees are accepted, so the payment
+    is valid only if that total equals amount.
+    """
+    covered = []
+    running_total = 0
+    for match in unpaid_matches:
+        if running_total + match["fee"] > amount:
+            break
+        running_total += match["fee"]
+        covered.append(match)
+    return covered, running_total
+
+
+def pay_player_fees(player, amount, method="cash"):
+    """
+    Pay amount off a player's oldest unpaid matches, as the Record Fee
+    Payment screen does, and return the matches paid for.  Raises
+    ValueError if amount is not a whole number of match fees.
+    """
+    unpaid = player_unpaid_matches(player)
+    total_due = player_balance_due(player)
+    if amount <= 0:
+        raise ValueError("Payment amount must be greater than £0")
+    if amount > total_due:
+        raise ValueError(f"Payment amount cannot exceed total due of £{total_due:.2f}")
+    covered, running_total = full_match_allocation(unpaid, amount)
+    if running_total != amount:
+        raise ValueError(f"Payment of £{amount:.2f} doesn't match full match payments")
+    for match in covered:
+        mark_paid(match, player, method)
+    return covered
 
 
 club_name = ""
 
 
+@screen_timed
 def add_player():
     """
     Ask for player names and print confirmations.
@@ -222,14 +1670,74 @@ def add_player():
             print("\nPlease enter a unique identifier for this player.")
             continue
 
-        players.append(name)
-        save_data()
+        create_player(name)
         added_count += 1
         print(f"✓ Added: {name}")
 
     return  # Returns to player_management menu
 
 
+# Width of each match's column on the team sheets and fees due screens,
+# so two fit side by side on an 80 column terminal
+TEAM_SHEET_WIDTH = 38
+
+# Column headings over each column of players in the player tables
+PLAYER_HEADER = f"{'No.':<3} {'Player':<20} {'Status':<6}"
+
+
+def player_cell(number, player, status):
+    """Return one player's entry in a player table."""
+    return f"{number:<3} {player[:20]:<20} {status}"
+
+
+def balance_lines(player_balances):
+    """Return the table of (player, balance due) pairs."""
+    header = f"{'Player':<20} {'Due':<8}"
+    cells = [f"{player[:19]:<20} £{amount:.2f}" for player, amount in player_balances]
+    return column_lines(cells, len(header), header)
+
+
+def team_selection_lines(selected_matches):
+    """
+    Return the lines showing each match's team beside the players still
+    available for it (in two columns).
+    """
+    row_format = row_formats([30, 20, 20], " | ")[3]
+    lines = []
+    for i, match in enumerate(selected_matches, 1):
+        date_fmt = match["date"].strftime("%d %b %y")
+        header = f"{i}. {date_fmt} VS {match['opponent']}".upper()
+        selected = [
+            f" {row}. {player}" for row, player in enumerate(match["players"], 1)
+        ] or ["No players selected"]
+        available = split_columns(available_players(match), 2)
+
+        lines += [
+            "",
+            row_format.format(header, "Available Players", "").rstrip(" |"),
+            row_format.format("-" * 30, "-" * 20, "-" * 20),
+        ]
+        for row in range(max(len(selected), len(available))):
+            cells = [selected[row] if row < len(selected) else ""]
+            cells += available[row] if row < len(available) else []
+            cells += [""] * (3 - len(cells))
+            lines.append(row_format.format(*cells).rstrip())
+    return lines
+
+
+def player_picker(names, status=None):
+    """
+    Return a Picker over names (players) for choosing by number or by
+    searching, showing each one's status ("Actv" or "Inac" unless given).
+    """
+    cells = []
+    for number, player in enumerate(names, 1):
+        label = status or ("Actv" if is_active(player) else "Inac")
+        cells.append(player_cell(number, player, label))
+    return Picker(names, cells, len(PLAYER_HEADER), PLAYER_HEADER)
+
+
+@screen_timed
 def list_players():
     """
     Print all players in two columns with status information.
@@ -242,45 +1750,22 @@ def list_players():
 
     sorted_players = sorted(players)
     total = len(sorted_players)
-    half = (total + 1) // 2  # Round up for odd numbers
-
-    print("-" * 64)
-    left_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-    right_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-    print(f"{left_header}  {right_header}")
-    print("-" * 64)
-
-    for i in range(half):
-        # Left column
-        left_no = i + 1
-        left_player = sorted_players[i][:20]  # Truncate if too long
-        left_status = "Inac" if sorted_players[i] in inactive_players else "Actv"
-        left_line = f"{left_no:<3} {left_player:<20} {left_status:<6}"
-
-        # Right column (if exists)
-        right_idx = i + half
-        if right_idx < total:
-            right_no = right_idx + 1
-            right_player = sorted_players[right_idx][:20]  # Truncate if too long
-            right_status = (
-                "Inac" if sorted_players[right_idx] in inactive_players else "Actv"
-            )
-            right_line = f"{right_no:<3} {right_player:<20} {right_status:<6}"
-            print(f"{left_line}  {right_line}")
-        else:
-            print(left_line)
-
-    print("-" * 64)
+    cells = [
+        player_cell(number, player, "Actv" if is_active(player) else "Inac")
+        for number, player in enumerate(sorted_players, 1)
+    ]
+    show(column_lines(cells, len(PLAYER_HEADER), PLAYER_HEADER), reserve=4)
     print(
         f"Total: {total} players "
-        f"({len([p for p in players if p not in inactive_players])} active, "
-        f"{len(inactive_players)} inactive)"
+        f"({active_count()} active, "
+        f"{len(players) - active_count()} inactive)"
     )
 
     # Wait for user input before returning to player management
     input("\nPress Enter to return to main menu...")
 
 
+@screen_timed
 def add_match():
     """
     Handle fixture operations - add, edit, or delete matches
@@ -309,6 +1794,8 @@ def add_match():
         if matches:
             print("2) Edit fixture")
             print("3) Delete fixture")
+        if archived_seasons:
+            print("4) Show older seasons")
         print("b) Back to main menu")
         print()
 
@@ -322,10 +1809,13 @@ def add_match():
             edit_existing_fixture()
         elif choice == "3" and matches:
             delete_existing_fixture()
+        elif choice == "4" and archived_seasons:
+            load_seasons_between()
         else:
             print("Please choose a valid option.")
 
 
+@screen_timed
 def add_new_fixture():
     """Add a new fixture"""
     print("\n=== Add New Fixture ===")
@@ -358,19 +1848,13 @@ def add_new_fixture():
             continue
 
         try:
-            parsed_date = datetime.strptime(date_input, "%d/%m/%y").date()
+            parsed_date = parse_match_date(date_input)
             break
         except ValueError:
-            try:
-                parsed_date = datetime.strptime(date_input, "%d/%m/%Y").date()
-                break
-            except ValueError:
-                print(
-                    "Invalid date. Please use DD/MM/YY (e.g. 05/09/25) or "
-                    "DD/MM/YYYY (e.g. 05/09/2025)."
-                )
-
-                continue
+            print(
+                "Invalid date. Please use DD/MM/YY (e.g. 05/09/25) or "
+                "DD/MM/YYYY (e.g. 05/09/2025)."
+            )
 
     # Get fee
     while True:
@@ -383,56 +1867,44 @@ def add_new_fixture():
             continue
 
         try:
-            fee = float(fee_input)
+            fee = parse_fee(fee_input)
             print(f"Match fee recorded: £{fee:.2f}")
             break
         except ValueError:
-            print("Invalid fee. Please enter a number.")
+            print("Invalid fee. Please enter an amount of £0 or more.")
             continue
 
-    # Create match object
-    match = {
-        "opponent": opponent,
-        "date": parsed_date,
-        "fee": fee,
-        "players": [],
-        "paid": [],
-    }
-
     # Check for duplicate matches
-    for existing_match in matches:
-        if (
-            existing_match["opponent"] == opponent
-            and existing_match["date"] == parsed_date
-        ):
-            print(
-                f"\n⚠ Note: You already have {club_name} vs {opponent} on "
-                f"{parsed_date.strftime('%d/%m/%Y')}"
+    if find_fixtures(parsed_date, opponent):
+        print(
+            f"\n⚠ Note: You already have {club_name} vs {opponent} on "
+            f"{parsed_date.strftime('%d/%m/%Y')}"
+        )
+        while True:
+            confirm = (
+                input("Add this match anyway? (y/n/b to go back): ").strip().lower()
             )
-            while True:
-                confirm = (
-                    input("Add this match anyway? (y/n/b to go back): ").strip().lower()
-                )
-                if confirm == "b":
-                    return
-                elif confirm == "y":
-                    break
-                elif confirm == "n":
-                    print("Match not added.")
-                    return
-                else:
-                    print("Please enter 'y', 'n', or 'b'")
-            break
+            if confirm == "b":
+                return
+            elif confirm == "y":
+                break
+            elif confirm == "n":
+                print("Match not added.")
+                return
+            else:
+                print("Please enter 'y', 'n', or 'b'")
+    else:
+        clash_warning(parsed_date)
 
     # Add the match
-    matches.append(match)
-    save_data()
+    create_fixture(opponent, parsed_date, fee)
     print(
         f"\n✓ Fixture added: {club_name} vs {opponent} on "
         f"{parsed_date.strftime('%d/%m/%Y')} - £{fee:.2f}"
     )
 
 
+@screen_timed
 def edit_existing_fixture():
     """Edit an existing fixture"""
     sorted_matches = get_matches_sorted()
@@ -476,31 +1948,26 @@ def edit_existing_fixture():
             # Edit date
             new_date = input("New date (DD/MM/YY or DD/MM/YYYY): ").strip()
             try:
-                parsed_date = datetime.strptime(new_date, "%d/%m/%y").date()
+                parsed_date = parse_match_date(new_date)
             except ValueError:
-                try:
-                    parsed_date = datetime.strptime(new_date, "%d/%m/%Y").date()
-                except ValueError:
-                    print("Invalid date format.")
-                    continue
-            selected_match["date"] = parsed_date
-            save_data()
+                print("Invalid date format.")
+                continue
+            clash_warning(parsed_date, exclude=selected_match)
+            update_fixture(selected_match, "date", parsed_date)
             print(f"✓ Date updated to {parsed_date.strftime('%d/%m/%Y')}")
 
         elif edit_choice == "2":
             # Edit opponent
             new_opponent = smart_title(input("New opponent: ").strip())
             if new_opponent:
-                selected_match["opponent"] = new_opponent
-                save_data()
+                update_fixture(selected_match, "opponent", new_opponent)
                 print(f"✓ Opponent updated to {new_opponent}")
 
         elif edit_choice == "3":
             # Edit fee
             try:
-                new_fee = float(input("New fee: ").strip())
-                selected_match["fee"] = new_fee
-                save_data()
+                new_fee = parse_fee(input("New fee: ").strip())
+                update_fixture(selected_match, "fee", new_fee)
                 print(f"✓ Fee updated to £{new_fee:.2f}")
             except ValueError:
                 print("Invalid fee.")
@@ -508,6 +1975,7 @@ def edit_existing_fixture():
             print("Please choose 1, 2, 3, or b")
 
 
+@screen_timed
 def delete_existing_fixture():
     """Delete an existing fixture"""
     sorted_matches = get_matches_sorted()
@@ -539,21 +2007,13 @@ def delete_existing_fixture():
     confirm = input("Type 'DELETE' to confirm: ").strip()
 
     if confirm == "DELETE":
-        # Find and remove from original matches list
-        for i, match in enumerate(matches):
-            if (
-                match["date"] == selected_match["date"]
-                and match["opponent"] == selected_match["opponent"]
-            ):
-                matches.pop(i)
-                break
-
-        save_data()
+        delete_fixture(selected_match)
         print("✓ Fixture deleted")
     else:
         print("Delete cancelled.")
 
 
+@screen_timed
 def mark_attendance():
     """
     Mark a player as attended for a match.
@@ -561,59 +2021,11 @@ def mark_attendance():
 
     if not matches or not players:
         print("You need at least one match and one player first.")
-        return
-
-    while True:  # Loop for filter selection
-        # Show filter options
-        print("\n=== Team Selection ===")
-        print("Show matches:")
-        print("1) Recent + upcoming (last 2 weeks + next 2 weeks)")
-        print("2) Last month's matches")
-        print("3) Next month's matches")
-        print("4) All matches")
-        print("b) Back to main menu")
-        print()
-
-        filter_choice = input("Choose filter: ").strip().lower()
-        if filter_choice == "b":
-            return
-        if filter_choice not in ["1", "2", "3", "4"]:
-            print("Please enter 1, 2, 3, 4, or b")
-            continue
-
-        filter_choice = int(filter_choice)
-
-        # Filter matches based on selection
-        from datetime import timedelta
-
-        today = datetime.now().date()
-
-        if filter_choice == 1:  # Recent + upcoming (4 weeks total)
-            start_date = today - timedelta(days=14)
-            end_date = today + timedelta(days=14)
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 2:  # Last month
-            start_date = today - timedelta(days=30)
-            end_date = today
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 3:  # Next month
-            start_date = today
-            end_date = today + timedelta(days=30)
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 4:  # All matches
-            filtered_matches = get_matches_sorted()
-
-        if not filtered_matches:
-            print("\nNo matches found for the selected period. Try a different filter.")
-            continue  # Go back to filter menu
+        return
 
-        break  # Exit loop if we have matches
+    filtered_matches = choose_filtered_matches("Team Selection")
+    if filtered_matches is None:
+        return
 
     # Display filtered matches in table format
     print("\n=== Matches ===")
@@ -623,13 +2035,10 @@ def mark_attendance():
     for i, match in enumerate(filtered_matches, 1):
         date_fmt = match["date"].strftime("%d %b %y")
         selected_count = len(match["players"])
-        active_players_list = [p for p in players if p not in inactive_players]
-        available_count = len(
-            [p for p in active_players_list if p not in match["players"]]
-        )
+        free_count = available_count(match)
 
         selected_display = "-" if selected_count == 0 else str(selected_count)
-        available_display = "-" if available_count == 0 else str(available_count)
+        available_display = "-" if free_count == 0 else str(free_count)
 
         print(
             f"{i:<4} {date_fmt:<10} {match['opponent']:<25} "
@@ -684,47 +2093,7 @@ def mark_attendance():
         print("\n=== Team Selection ===")
 
         # Display matches vertically with available players in columns
-        for i, match in enumerate(selected_matches, 1):
-            date_fmt = match["date"].strftime("%d %b %y")
-            header = f"{i}. {date_fmt} VS {match['opponent']}".upper()
-
-            # Get available players for this match - use safe variable names
-            active_players_list = [p for p in players if p not in inactive_players]
-            available_players_list = [
-                p for p in active_players_list if p not in match["players"]
-            ]
-
-            # Split available players into two columns
-            half = (len(available_players_list) + 1) // 2
-            col1 = available_players_list[:half]
-            col2 = available_players_list[half:]
-
-            print(f"\n{header:<30} | Available Players")
-            print("-" * 30 + "-|-" + "-" * 40)
-
-            # Show selected players and available players side by side
-            max_rows = max(len(match["players"]), len(col1))
-
-            for row in range(max_rows):
-                # Selected player column
-                if row < len(match["players"]):
-                    player = match["players"][row]
-                    selected_display = f" {row+1}. {player}"
-                else:
-                    selected_display = ""
-
-                # Available players columns
-                avail1 = col1[row] if row < len(col1) else ""
-                avail2 = col2[row] if row < len(col2) else ""
-
-                print(f"{selected_display:<30} | {avail1:<18} | {avail2}")
-
-            # Show "No players selected" only if no players are selected
-            if not match["players"]:
-                print(
-                    f"{'No players selected':<30} | {col1[0] if col1 else '':<18} | "
-                    f"{col2[0] if col2 else ''}"
-                )
+        show(team_selection_lines(selected_matches))
 
         print(f"\nSelected {len(selected_matches)} match(es) for team selection.")
 
@@ -747,11 +2116,12 @@ def mark_attendance():
             input("Press Enter to continue...")
 
 
+@screen_timed
 def add_players_to_matches(selected_matches):
     """Handle adding players to matches in main team selection context"""
     while True:
         # Find players available for matches
-        local_active_players = [p for p in players if p not in inactive_players]
+        local_active_players = get_active_players()
         local_player_availability = []
 
         for local_player in local_active_players:
@@ -759,7 +2129,7 @@ def add_players_to_matches(selected_matches):
             local_availability_display = []
 
             for local_i, local_match in enumerate(selected_matches, 1):
-                if local_player not in local_match["players"]:
+                if not is_selected(local_match, local_player):
                     local_available_match_nums.append(str(local_i))
                     local_availability_display.append("-Avail-")
                 else:
@@ -802,11 +2172,7 @@ def add_players_to_matches(selected_matches):
                 local_header += f" {local_opponent:<9}"
                 local_base_width += 10
 
-            local_separator = "-" * local_base_width
-            print(local_separator)
-            print(local_header)
-            print(local_separator)
-
+            local_lines = []
             for local_i, (
                 local_player,
                 local_availability,
@@ -818,15 +2184,23 @@ def add_players_to_matches(selected_matches):
                     if local_display_avail != "-":
                         local_display_avail = local_display_avail[:8]
                     local_line += f" {local_display_avail:<9}"
-                print(local_line)
-
-            print(local_separator)
+                local_lines.append(local_line)
+
+            local_picker = Picker(
+                [local_player for local_player, _, _ in local_player_availability],
+                local_lines,
+                local_base_width,
+                local_header,
+                reserved=("b", "all"),
+                reserve=len(selected_matches) + 5,
+            )
+            local_picker.show()
             print(f"Total available players: {len(local_player_availability)}")
 
             # Go directly to player selection instead of showing menu
-            local_players_input = input(
+            local_players_input = local_picker.ask(
                 "\nSelect players to add: 1,3,5 | 1-5 | all | b=back:"
-            ).strip()
+            )
 
             if local_players_input.lower() == "b":
                 break
@@ -936,12 +2310,11 @@ def add_players_to_matches(selected_matches):
 
                         for local_match_idx in local_target_match_indices:
                             if local_match_idx in local_available_indices:
-                                selected_matches[local_match_idx]["players"].append(
-                                    local_player
+                                select_player(
+                                    selected_matches[local_match_idx], local_player
                                 )
                                 local_added_count += 1
 
-                    save_data()
 
                     # Show confirmation
                     if local_added_count > 0:
@@ -991,21 +2364,20 @@ def add_players_to_matches(selected_matches):
             break
 
 
+@screen_timed
 def remove_players_from_matches(selected_matches):
     """Handle removing players from matches in main team selection context"""
     while True:
         # Find players currently in matches
         local_player_removal_options = []
 
-        for local_player in sorted(players):
-            if local_player in inactive_players:
-                continue  # Skip inactive players
+        for local_player in selected_active_players(selected_matches):
 
             local_current_match_nums = []
             local_player_match_display = []
 
             for local_i, local_match in enumerate(selected_matches, 1):
-                if local_player in local_match["players"]:
+                if is_selected(local_match, local_player):
                     local_current_match_nums.append(str(local_i))
                     local_player_match_display.append("-Avail-")
                 else:
@@ -1181,16 +2553,15 @@ def remove_players_from_matches(selected_matches):
 
                         for local_match_idx in local_target_match_indices:
                             if local_match_idx in local_current_indices:
-                                if (
-                                    local_player
-                                    in selected_matches[local_match_idx]["players"]
+                                if is_selected(
+                                    selected_matches[local_match_idx], local_player
                                 ):
-                                    selected_matches[local_match_idx]["players"].remove(
-                                        local_player
+                                    deselect_player(
+                                        selected_matches[local_match_idx],
+                                        local_player,
                                     )
                                     local_removed_count += 1
 
-                    save_data()
 
                     # Show confirmation
                     if local_removed_count > 0:
@@ -1244,6 +2615,7 @@ def remove_players_from_matches(selected_matches):
             break
 
 
+@screen_timed
 def list_matches():
     """
     Display fixture list with match selection functionality
@@ -1252,57 +2624,9 @@ def list_matches():
         print("\nNo matches scheduled yet.")
         return
 
-    while True:  # Loop for filter selection
-        # Show filter options
-        print("\n=== Fixture List ===")
-        print("Show matches:")
-        print("1) Recent + upcoming (last 2 weeks + next 2 weeks)")
-        print("2) Last month's matches")
-        print("3) Next month's matches")
-        print("4) All matches")
-        print("b) Back to main menu")
-        print()
-
-        filter_choice = input("Choose filter: ").strip().lower()
-        if filter_choice == "b":
-            return
-        if filter_choice not in ["1", "2", "3", "4"]:
-            print("Please enter 1, 2, 3, 4, or b")
-            continue
-
-        filter_choice = int(filter_choice)
-
-        # Filter matches based on selection
-        from datetime import timedelta
-
-        today = datetime.now().date()
-
-        if filter_choice == 1:  # Recent + upcoming (4 weeks total)
-            start_date = today - timedelta(days=14)
-            end_date = today + timedelta(days=14)
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 2:  # Last month
-            start_date = today - timedelta(days=30)
-            end_date = today
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 3:  # Next month
-            start_date = today
-            end_date = today + timedelta(days=30)
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 4:  # All matches
-            filtered_matches = get_matches_sorted()
-
-        if not filtered_matches:
-            print("\nNo matches found for the selected period. Try a different filter.")
-            continue  # Go back to filter menu
-
-        break  # Exit loop if we have matches
+    filtered_matches = choose_filtered_matches("Fixture List")
+    if filtered_matches is None:
+        return
 
     # Display fixtures for selection
     print("\n=== Select Fixtures to View ===")
@@ -1405,63 +2729,16 @@ def list_matches():
     input("\nPress Enter to continue...")
 
 
+@screen_timed
 def show_team_sheets():
     """Display team sheets with match selection and team management options"""
     if not matches:
         print("\nNo matches recorded yet.")
         return
 
-    while True:  # Loop for filter selection
-        # Show filter options
-        print("\n=== Team Sheets ===")
-        print("Show matches:")
-        print("1) Recent + upcoming (last 2 weeks + next 2 weeks)")
-        print("2) Last month's matches")
-        print("3) Next month's matches")
-        print("4) All matches")
-        print("b) Back to match fees menu")
-        print()
-
-        filter_choice = input("Choose filter: ").strip().lower()
-        if filter_choice == "b":
-            return
-        if filter_choice not in ["1", "2", "3", "4"]:
-            print("Please enter 1, 2, 3, 4, or b")
-            continue
-
-        filter_choice = int(filter_choice)
-
-        # Filter matches based on selection
-        from datetime import timedelta
-
-        today = datetime.now().date()
-
-        if filter_choice == 1:  # Recent + upcoming (4 weeks total)
-            start_date = today - timedelta(days=14)
-            end_date = today + timedelta(days=14)
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 2:  # Last month
-            start_date = today - timedelta(days=30)
-            end_date = today
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 3:  # Next month
-            start_date = today
-            end_date = today + timedelta(days=30)
-            filtered_matches = [
-                m for m in get_matches_sorted() if start_date <= m["date"] <= end_date
-            ]
-        elif filter_choice == 4:  # All matches
-            filtered_matches = get_matches_sorted()
-
-        if not filtered_matches:
-            print("\nNo matches found for the selected period. Try a different filter.")
-            continue  # Go back to filter menu
-
-        break  # Exit loop if we have matches
+    filtered_matches = choose_filtered_matches("Team Sheets", "Back to match fees menu")
+    if filtered_matches is None:
+        return
 
     # Display fixtures for selection
     print("\n=== Select Matches for Team Sheets ===")
@@ -1538,83 +2815,19 @@ def show_team_sheets():
                 "(e.g. 1,3,5 or 1-5 or 'all') or 'b' to go back"
             )
 
-    # Display selected team sheets in two columns
+    # Display selected team sheets side by side
     print("\n=== Team Sheets ===")
-
-    # Split matches into pairs for two-column display
-    for i in range(0, len(selected_matches), 2):
-        # Left column match
-        left_match = selected_matches[i]
-        left_date = left_match["date"].strftime("%d %b %y")
-        left_header = f"{i+1}. {left_date} VS {left_match['opponent']}".upper()
-
-        # Right column match (if exists)
-        right_match = selected_matches[i + 1] if i + 1 < len(selected_matches) else None
-        if right_match:
-            right_date = right_match["date"].strftime("%d %b %y")
-            right_header = f"{i+2}. {right_date} VS {right_match['opponent']}".upper()
-
-        # Display headers
-        if right_match:
-            print(f"\n{left_header:<40} | {right_header}")
-            print("-" * 40 + "|-" + "-" * 40)
-        else:
-            print(f"\n{left_header}")
-            print("-" * 40)
-
-        # Display team lists side by side
-        left_players = (
-            left_match["players"]
-            if left_match["players"]
-            else ["No players selected yet"]
-        )
-        right_players = (
-            right_match["players"]
-            if right_match and right_match["players"]
-            else (["No players selected yet"] if right_match else [])
-        )
-
-        max_players = max(len(left_players), len(right_players))
-
-        # Show team counts
-        left_count = (
-            f"Team ({len(left_match['players'])} players):"
-            if left_match["players"]
-            else "No team selected:"
-        )
-        right_count = (
-            f"Team ({len(right_match['players'])} players):"
-            if right_match and right_match["players"]
-            else ("No team selected:" if right_match else "")
-        )
-
-        if right_match:
-            print(f"{left_count:<40} | {right_count}")
+    sheets = []
+    for number, match in enumerate(selected_matches, 1):
+        date_fmt = match["date"].strftime("%d %b %y")
+        sheet = [f"{number}. {date_fmt} VS {match['opponent']}".upper(), "-"]
+        if match["players"]:
+            sheet.append(f"Team ({len(match['players'])} players):")
+            sheet += [f"  {j:2}. {p}" for j, p in enumerate(match["players"], 1)]
         else:
-            print(left_count)
-
-        # Display players side by side
-        for j in range(max_players):
-            if j < len(left_players):
-                if left_match["players"]:
-                    left_display = f"  {j+1:2}. {left_players[j]}"
-                else:
-                    left_display = f"  {left_players[j]}"
-            else:
-                left_display = ""
-
-            if right_match and j < len(right_players):
-                if right_match["players"]:
-                    right_display = f"  {j+1:2}. {right_players[j]}"
-                else:
-                    right_display = f"  {right_players[j]}"
-            else:
-                right_display = ""
-
-            if right_match:
-                print(f"{left_display:<40} | {right_display}")
-            else:
-                print(left_display)
+            sheet += ["No team selected:", "  No players selected yet"]
+        sheets.append(sheet)
+    show([""] + side_by_side(sheets, TEAM_SHEET_WIDTH))
 
     # Summary for multiple matches
     if len(selected_matches) > 1:
@@ -1646,48 +2859,7 @@ def show_team_sheets():
             print("\n=== Update Team Selection ===")
 
             # Display matches vertically with available players in columns
-            for i, match in enumerate(selected_matches, 1):
-                date_fmt = match["date"].strftime("%d %b %y")
-                header = f"{i}. {date_fmt} VS {match['opponent']}".upper()
-
-                # Get available players for this match - use safe variable names
-                local_active_players = [p for p in players if p not in inactive_players]
-                local_available_players = [
-                    p for p in local_active_players if p not in match["players"]
-                ]
-
-                # Split available players into two columns
-                half = (len(local_available_players) + 1) // 2
-                col1 = local_available_players[:half]
-                col2 = local_available_players[half:]
-
-                print(f"\n{header:<30} | Available Players")
-                print("-" * 30 + "-|-" + "-" * 40)
-
-                # Show selected players and available players side by side
-                max_rows = max(len(match["players"]), len(col1))
-
-                for row in range(max_rows):
-                    # Selected player column
-                    if row < len(match["players"]):
-                        player = match["players"][row]
-                        selected_display = f" {row+1}. {player}"
-                    else:
-                        selected_display = ""
-
-                    # Available players columns
-                    avail1 = col1[row] if row < len(col1) else ""
-                    avail2 = col2[row] if row < len(col2) else ""
-
-                    print(f"{selected_display:<30} | {avail1:<18} | {avail2}")
-
-                # Show "No players selected" only if no players are selected
-                if not match["players"]:
-                    print(
-                        f"{'No players selected':<30} | "
-                        f"{col1[0] if col1 else '':<18} | "
-                        f"{col2[0] if col2 else ''}"
-                    )
+            show(team_selection_lines(selected_matches))
 
             print(
                 f"\nSelected {len(selected_matches)} match(es) "
@@ -1714,11 +2886,12 @@ def show_team_sheets():
                     input("Press Enter to continue...")
 
 
+@screen_timed
 def team_sheets_add_players(selected_matches):
     """Handle adding players in team sheets context"""
     while True:
         # Find players available for matches using safe variable names
-        local_active_players = [p for p in players if p not in inactive_players]
+        local_active_players = get_active_players()
         local_player_availability = []
 
         for local_player in local_active_players:
@@ -1726,7 +2899,7 @@ def team_sheets_add_players(selected_matches):
             local_availability_display = []
 
             for local_i, local_match in enumerate(selected_matches, 1):
-                if local_player not in local_match["players"]:
+                if not is_selected(local_match, local_player):
                     local_available_match_nums.append(str(local_i))
                     local_opponent = local_match["opponent"].split()[0][:8]
                     local_availability_display.append(local_opponent)
@@ -1878,12 +3051,11 @@ def team_sheets_add_players(selected_matches):
 
                     for local_match_idx in local_target_match_indices:
                         if local_match_idx in local_available_indices:
-                            selected_matches[local_match_idx]["players"].append(
-                                local_player
+                            select_player(
+                                selected_matches[local_match_idx], local_player
                             )
                             local_added_count += 1
 
-                save_data()
 
                 if local_added_count > 0:
                     print("\n✓ Players added successfully!")
@@ -1899,21 +3071,20 @@ def team_sheets_add_players(selected_matches):
             print("Please enter valid numbers")
 
 
+@screen_timed
 def team_sheets_remove_players(selected_matches):
     """Handle removing players in team sheets context"""
     while True:
         # Find players currently in matches
         local_player_removal_options = []
 
-        for local_player in sorted(players):
-            if local_player in inactive_players:
-                continue
+        for local_player in selected_active_players(selected_matches):
 
             local_current_match_nums = []
             local_player_match_display = []
 
             for local_i, local_match in enumerate(selected_matches, 1):
-                if local_player in local_match["players"]:
+                if is_selected(local_match, local_player):
                     local_current_match_nums.append(str(local_i))
                     local_opponent = local_match["opponent"].split()[0][:8]
                     local_player_match_display.append(local_opponent)
@@ -2071,16 +3242,14 @@ def team_sheets_remove_players(selected_matches):
 
                     for local_match_idx in local_target_match_indices:
                         if local_match_idx in local_current_indices:
-                            if (
-                                local_player
-                                in selected_matches[local_match_idx]["players"]
+                            if is_selected(
+                                selected_matches[local_match_idx], local_player
                             ):
-                                selected_matches[local_match_idx]["players"].remove(
-                                    local_player
+                                deselect_player(
+                                    selected_matches[local_match_idx], local_player
                                 )
                                 local_removed_count += 1
 
-                save_data()
 
                 if local_removed_count > 0:
                     print("\n✓ Players removed successfully!")
@@ -2129,6 +3298,37 @@ def list_players_indexed():
         number += 1
 
 
+@screen_timed
+def show_storage_status():
+    """Show where club data is saved and how long saving takes."""
+    print("\n=== Data File Status ===")
+    if STORAGE == "sqlite":
+        print(f"Database: {DATABASE_FILE} (each change saved as it is made)")
+    else:
+        print(f"Data file: {DATA_FILE}")
+        if archived_seasons:
+            seasons = ", ".join(str(s) for s in sorted(archived_seasons))
+            print(f"Older seasons not loaded: {seasons}")
+        if JOURNAL_ENABLED:
+            print(
+                f"Journal: {JOURNAL_FILE} "
+                f"({journal_pending} change(s) since last save)"
+            )
+        else:
+            print("Journal: off (data file rewritten on every change)")
+        print(f"Backups kept: {DATA_BACKUPS}")
+    print(f"Saves this session: {save_stats['saves']}")
+    if save_stats["saves"]:
+        average = save_stats["total_seconds"] / save_stats["saves"]
+        print(f"Last save: {save_stats['last_seconds'] * 1000:.1f} ms")
+        print(f"Average save: {average * 1000:.1f} ms")
+    print(f"Failed saves: {save_stats['failures']}")
+    if save_stats["last_error"]:
+        print(f"Last error: {save_stats['last_error']}")
+    input("\nPress Enter to continue...")
+
+
+@screen_timed
 def club_management():
     """
     Handle club management options
@@ -2136,6 +3336,7 @@ def club_management():
     while True:
         print("\n=== Club Management ===")
         print("1) Delete club data")
+        print("2) Data file status")
         print("b) Back to main menu")
         print()
 
@@ -2143,6 +3344,8 @@ def club_management():
 
         if choice == "b":
             break
+        elif choice == "2":
+            show_storage_status()
         elif choice == "1":
             confirm = (
                 input(
@@ -2153,18 +3356,23 @@ def club_management():
                 .lower()
             )
             if confirm == "yes":
-                players.clear()
+                wait_for_compaction()
+                load_players([])
                 matches.clear()
                 inactive_players.clear()
-                # Delete the data file if it exists
-                if os.path.exists(DATA_FILE):
-                    os.remove(DATA_FILE)
+                archived_seasons.clear()
+                rebuild_indexes()
+                # Delete the data, journal and season files if they exist
+                remove_files(
+                    DATA_FILE, JOURNAL_FILE, *glob.glob(season_file(DATA_FILE, "*"))
+                )
                 print("All club data has been deleted.")
                 # Prompt for new club name
                 global club_name
                 club_name = input("Enter new club name: ").strip()
                 if not club_name:
                     club_name = "My Club"
+                save_data()
                 print(f"✓ Club name set to: {club_name}")
             else:
                 print("Delete cancelled.")
@@ -2172,32 +3380,64 @@ def club_management():
             print("Please choose a valid option.")
 
 
+def choose_payment_method():
+    """Ask how a payment was made; just pressing Enter means cash."""
+    methods = list(PAYMENT_METHODS)
+    options = "  ".join(
+        f"{i}) {PAYMENT_METHODS[method]}" for i, method in enumerate(methods, 1)
+    )
+    while True:
+        choice = input(f"Paid by {options} (Enter for cash): ").strip()
+        if not choice:
+            return "cash"
+        if choice.isdigit() and 1 <= int(choice) <= len(methods):
+            return methods[int(choice) - 1]
+        print(f"Please enter a number between 1 and {len(methods)}")
+
+
+@screen_timed
+def show_takings_by_day():
+    """Show the money taken each day over the last month, by method."""
+    start_date, end_date = date_window("last_month")
+    days = takings_by_day(start_date, end_date)
+
+    print("\n=== Takings by Day (last 30 days) ===")
+    if not days:
+        print("\nNo payments taken in the last 30 days.")
+        input("\nPress Enter to continue...")
+        return
+
+    columns = list(PAYMENT_METHODS)
+    if any("unknown" in by_method for _, by_method in days):
+        columns.append("unknown")
+    headings = [PAYMENT_METHODS.get(method, "Other") for method in columns]
+    print(f"{'Date':<10} " + "".join(f"{h:<15}" for h in headings) + "Total")
+    print("-" * (17 + 15 * len(columns)))
+
+    totals = dict.fromkeys(columns, 0)
+    for day, by_method in days:
+        cells = ""
+        for method in columns:
+            amount = by_method.get(method, 0)
+            totals[method] += amount
+            cells += f"{f'£{amount:.2f}' if amount else '-':<15}"
+        print(f"{day.strftime('%d %b %y'):<10} {cells}£{sum(by_method.values()):.2f}")
+
+    print("-" * (17 + 15 * len(columns)))
+    cells = "".join(f"{f'£{totals[method]:.2f}':<15}" for method in columns)
+    print(f"{'TOTAL':<10} {cells}£{sum(totals.values()):.2f}")
+    input("\nPress Enter to continue...")
+
+
+@screen_timed
 def record_payment():
     """Record match fee payments with streamlined player selection"""
     if not matches or not players:
         print("\nYou need at least one match and one player first.")
         return
 
-    # Find players who owe fees
-    players_with_fees = []
-
-    for player in sorted(players):
-        if player in inactive_players:
-            continue  # Skip inactive players
-
-        # Get all unpaid matches for this player (oldest first)
-        unpaid_matches = []
-        total_due = 0
-
-        for match in get_matches_sorted():  # Already sorted by date
-            if player in match.get("players", []) and player not in match.get(
-                "paid", []
-            ):
-                unpaid_matches.append(match)
-                total_due += match["fee"]
-
-        if unpaid_matches:
-            players_with_fees.append((player, unpaid_matches, total_due))
+    # Find active players who owe fees
+    players_with_fees = players_with_fees_due()
 
     if not players_with_fees:
         print("\nNo players have outstanding fees.")
@@ -2209,28 +3449,34 @@ def record_payment():
 
         # Show players with outstanding fees
         print("Players with outstanding fees:")
-        print("-" * 70)
-        print(f"{'No.':<3} {'Player':<20} {'Matches Due':<12} {'Total Due':<12}")
-        print("-" * 70)
-
-        for i, (player, unpaid_matches, total_due) in enumerate(players_with_fees, 1):
-            matches_count = len(unpaid_matches)
-            print(f"{i:<3} {player:<20} {matches_count:<12} £{total_due:.2f}")
-
-        print("-" * 70)
+        header = f"{'No.':<3} {'Player':<20} {'Matches Due':<12} {'Total Due':<12}"
+        picker = Picker(
+            [player for player, _, _ in players_with_fees],
+            [
+                f"{i:<3} {player:<20} {matches_count:<12} £{total_due:.2f}"
+                for i, (player, matches_count, total_due) in enumerate(
+                    players_with_fees, 1
+                )
+            ],
+            len(header),
+            header,
+            reserved=("b",),
+            reserve=6,
+        )
+        picker.show()
         print(f"Total players with fees due: {len(players_with_fees)}")
 
         print(f"\nSelect player (1-{len(players_with_fees)}) or 'b' to go back:")
 
-        choice = input("\nChoose player: ").strip().lower()
+        choice = picker.ask("\nChoose player: ").lower()
 
         if choice == "b":
             break
         elif choice.isdigit() and 1 <= int(choice) <= len(players_with_fees):
             # Direct player selection
-            selected_player, unpaid_matches, total_due = players_with_fees[
-                int(choice) - 1
-            ]
+            selected_player, _, total_due = players_with_fees[int(choice) - 1]
+            # Unpaid matches for this player, oldest first
+            unpaid_matches = player_unpaid_matches(selected_player)
 
             # Show player's outstanding fees breakdown
             print(f"\n=== Fee Details for {selected_player} ===")
@@ -2277,30 +3523,23 @@ def record_payment():
                         continue
 
                     # Check if payment covers full matches only
-                    full_matches_that_can_be_paid = 0
-                    running_total = 0
-
-                    for match in unpaid_matches:
-                        if running_total + match["fee"] <= payment_amount:
-                            running_total += match["fee"]
-                            full_matches_that_can_be_paid += 1
-                        else:
-                            break
+                    covered, running_total = full_match_allocation(
+                        unpaid_matches, payment_amount
+                    )
+                    full_matches_that_can_be_paid = len(covered)
 
                     if running_total == payment_amount:
                         # Perfect match - can pay exact number of full matches
+                        method = choose_payment_method()
                         payments_made = []
 
-                        for i in range(full_matches_that_can_be_paid):
-                            match = unpaid_matches[i]
-                            match["paid"].append(selected_player)
+                        for match in covered:
+                            mark_paid(match, selected_player, method)
                             payments_made.append((match, match["fee"], "Full"))
 
-                        save_data()
-
                         print(
                             f"\n✓ Payment of £{payment_amount:.2f} recorded for "
-                            f"{selected_player}"
+                            f"{selected_player} ({PAYMENT_METHODS[method]})"
                         )
 
                         print("\nPayment allocated to:")
@@ -2317,31 +3556,8 @@ def record_payment():
                             f"£{total_due - payment_amount:.2f}"
                         )
 
-                        # Update the players_with_fees list
-                        updated_unpaid = []
-                        updated_total = 0
-                        for match in unpaid_matches:
-                            if selected_player not in match.get("paid", []):
-                                updated_unpaid.append(match)
-                                updated_total += match["fee"]
-
-                        if updated_unpaid:
-                            # Update the entry
-                            for i, (player, _, _) in enumerate(players_with_fees):
-                                if player == selected_player:
-                                    players_with_fees[i] = (
-                                        player,
-                                        updated_unpaid,
-                                        updated_total,
-                                    )
-                                    break
-                        else:
-                            # Remove player from list (all fees paid)
-                            players_with_fees = [
-                                (p, m, t)
-                                for p, m, t in players_with_fees
-                                if p != selected_player
-                            ]
+                        # Refresh the list from the updated balances
+                        players_with_fees = players_with_fees_due()
 
                         input("\nPress Enter to continue...")
                         break
@@ -2397,12 +3613,14 @@ def record_payment():
             input("Press Enter to continue...")
 
 
+@screen_timed
 def view_fee_balances():
     """Show fee balance options"""
     while True:
         print("\n=== Match Fee Reports ===")
         print("1) Player fee balances")
         print("2) Match financial report")
+        print("3) Takings by day")
         print("b) Back to main menu")
         print()
 
@@ -2419,59 +3637,16 @@ def view_fee_balances():
 
             print("\n=== Player Fee Balances ===")
 
-            # Calculate balances for all players
-            player_balances = []
-            total_outstanding = 0
-
-            for player in sorted(players):
-                total_owed = 0
-                total_paid = 0
-
-                for match in matches:
-                    if player in match.get("players", []):
-                        total_owed += match["fee"]
-                        if player in match.get("paid", []):
-                            total_paid += match["fee"]
-
-                balance_due = total_owed - total_paid
-                total_outstanding += balance_due
-
-                # Only include players who owe money
-                if balance_due > 0:
-                    player_balances.append((player, balance_due))
+            # Balances are kept up to date as teams and payments change
+            player_balances = players_owing()
+            total_outstanding = total_outstanding_fees()
 
             if not player_balances:
                 print("\nNo outstanding fees - all players are up to date!")
                 input("\nPress Enter to continue...")
                 continue
 
-            # Display in two columns
-            total_players = len(player_balances)
-            half = (total_players + 1) // 2
-
-            print("-" * 70)
-            left_header = f"{'Player':<20} {'Due':<8}"
-            right_header = f"{'Player':<20} {'Due':<8}"
-            print(f"{left_header}  {right_header}")
-            print("-" * 70)
-
-            for i in range(half):
-                # Left column
-                left_player, left_amount = player_balances[i]
-                left_player_display = left_player[:19]  # Truncate if too long
-                left_line = f"{left_player_display:<20} £{left_amount:.2f}  "
-
-                # Right column (if exists)
-                right_idx = i + half
-                if right_idx < total_players:
-                    right_player, right_amount = player_balances[right_idx]
-                    right_player_display = right_player[:19]
-                    right_line = f"{right_player_display:<20} £{right_amount:.2f}"
-                    print(f"{left_line} {right_line}")
-                else:
-                    print(left_line)
-
-            print("-" * 70)
+            show(balance_lines(player_balances), reserve=4)
             print(f"TOTAL OUTSTANDING: £{total_outstanding:.2f}")
             print(f"Players with fees due: {len(player_balances)}")
 
@@ -2486,62 +3661,11 @@ def view_fee_balances():
 
             # Filter selection
             while True:
-                print("\n=== Match Financial Report ===")
-                print("Show matches:")
-                print("1) Recent + upcoming (last 2 weeks + next 2 weeks)")
-                print("2) Last month's matches")
-                print("3) Next month's matches")
-                print("4) All matches")
-                print("b) Back to fee reports menu")
-                print()
-
-                filter_choice = input("Choose filter: ").strip().lower()
-                if filter_choice == "b":
+                filtered_matches = choose_filtered_matches(
+                    "Match Financial Report", "Back to fee reports menu"
+                )
+                if filtered_matches is None:
                     break
-                if filter_choice not in ["1", "2", "3", "4"]:
-                    print("Please enter 1, 2, 3, 4, or b")
-                    continue
-
-                filter_choice = int(filter_choice)
-
-                # Filter matches
-                from datetime import timedelta
-
-                today = datetime.now().date()
-
-                if filter_choice == 1:
-                    start_date = today - timedelta(days=14)
-                    end_date = today + timedelta(days=14)
-                    filtered_matches = [
-                        m
-                        for m in get_matches_sorted()
-                        if start_date <= m["date"] <= end_date
-                    ]
-                elif filter_choice == 2:
-                    start_date = today - timedelta(days=30)
-                    end_date = today
-                    filtered_matches = [
-                        m
-                        for m in get_matches_sorted()
-                        if start_date <= m["date"] <= end_date
-                    ]
-                elif filter_choice == 3:
-                    start_date = today
-                    end_date = today + timedelta(days=30)
-                    filtered_matches = [
-                        m
-                        for m in get_matches_sorted()
-                        if start_date <= m["date"] <= end_date
-                    ]
-                elif filter_choice == 4:
-                    filtered_matches = get_matches_sorted()
-
-                if not filtered_matches:
-                    print(
-                        "\nNo matches found for the selected period. "
-                        "Try a different filter."
-                    )
-                    continue
 
                 # Show matches for selection
                 print("\n=== Select Matches for Financial Report ===")
@@ -2628,26 +3752,23 @@ def view_fee_balances():
 
                             print("-" * 65)
 
-                            grand_total_fees = 0
-                            grand_total_paid = 0
-                            grand_total_due = 0
+                            figures = match_fee_summary(selected_matches)
+                            grand_total_fees = figures["total_fees"] / 100
+                            grand_total_paid = figures["total_collected"] / 100
+                            grand_total_due = figures["total_due"] / 100
 
-                            for match in selected_matches:
+                            for index, match in enumerate(selected_matches):
                                 date_fmt = match["date"].strftime("%d %b %y")
-                                player_count = len(match["players"])
+                                player_count = figures["team"][index]
 
                                 if player_count == 0:
-                                    total_fees = 0
-                                    total_paid = 0
-                                    due = 0
                                     fees_display = "-"
                                     paid_display = "-"
                                     due_display = "-"
                                 else:
-                                    total_fees = player_count * match["fee"]
-                                    paid_count = len(match.get("paid", []))
-                                    total_paid = paid_count * match["fee"]
-                                    due = total_fees - total_paid
+                                    total_fees = figures["fees"][index] / 100
+                                    total_paid = figures["collected"][index] / 100
+                                    due = figures["due"][index] / 100
 
                                     fees_display = f"£{total_fees:.0f}"
                                     paid_display = (
@@ -2655,10 +3776,6 @@ def view_fee_balances():
                                     )
                                     due_display = f"£{due:.0f}" if due > 0 else "-"
 
-                                    grand_total_fees += total_fees
-                                    grand_total_paid += total_paid
-                                    grand_total_due += due
-
                                 player_display = (
                                     str(player_count) if player_count > 0 else "-"
                                 )
@@ -2694,11 +3811,8 @@ def view_fee_balances():
                                 print(f"• Amount collected: £{grand_total_paid:.0f}")
                                 print(f"• Still due: £{grand_total_due:.0f}")
 
-                                if grand_total_fees > 0:
-                                    collection_rate = (
-                                        grand_total_paid / grand_total_fees
-                                    ) * 100
-                                    print(f"• Collection rate: {collection_rate:.1f}%")
+                                collection_rate = figures["collection_rate_overall"]
+                                print(f"• Collection rate: {collection_rate:.1f}%")
                             else:
                                 print(
                                     "No fees generated - "
@@ -2721,17 +3835,20 @@ def view_fee_balances():
                         )
 
                 break  # Exit filter loop
+        elif choice == "3":
+            show_takings_by_day()
         else:
             print("Please choose a valid option.")
 
 
+@screen_timed
 def make_player_inactive():
     """Make a player inactive"""
     if not players:
         print("\nNo players to make inactive.")
         return
 
-    active_players = [player for player in players if player not in inactive_players]
+    active_players = get_active_players()
 
     if not active_players:
         print("\nNo active players to make inactive.")
@@ -2740,40 +3857,16 @@ def make_player_inactive():
     print("\n=== Make Player Inactive ===")
 
     # Show active players
-    total = len(active_players)
-    half = (total + 1) // 2  # Round up for odd numbers
-
-    print("-" * 64)
-    left_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-    right_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-    print(f"{left_header}  {right_header}")
-    print("-" * 64)
-
-    for i in range(half):
-        # Left column
-        left_no = i + 1
-        left_player = active_players[i][:20]  # Truncate if too long
-        left_line = f"{left_no:<3} {left_player:<20} {'Actv':<6}"
-
-        # Right column (if exists)
-        right_idx = i + half
-        if right_idx < total:
-            right_no = right_idx + 1
-            right_player = active_players[right_idx][:20]  # Truncate if too long
-            right_line = f"{right_no:<3} {right_player:<20} {'Actv':<6}"
-            print(f"{left_line}  {right_line}")
-        else:
-            print(left_line)
-
-    print("-" * 64)
+    picker = player_picker(active_players, "Actv")
+    picker.show()
     # Get player selection
     made_inactive_count = 0
 
     while active_players:  # Continue while there are active players
         # Get player selection
-        choice = input(
+        choice = picker.ask(
             "\nEnter player number to make inactive (or Enter to finish): "
-        ).strip()
+        )
         if not choice:  # Empty input - finish
             break
 
@@ -2781,8 +3874,9 @@ def make_player_inactive():
             selected_player = active_players[int(choice) - 1]
 
             # Make the player inactive
-            inactive_players.append(selected_player)
+            deactivate_player(selected_player)
             active_players.remove(selected_player)  # Remove from our working list
+            picker = player_picker(active_players, "Actv")
             made_inactive_count += 1
             print(f"\n✓ {selected_player.upper()} has been made inactive")
 
@@ -2796,19 +3890,14 @@ def make_player_inactive():
             print(f"Please enter 1-{len(active_players)}")
 
     if made_inactive_count > 0:
-        save_data()
         print(f"\nFinished. Made {made_inactive_count} player(s) inactive.")
     else:
         print("\nNo players were made inactive.")
 
 
+@screen_timed
 def make_player_active():
-    """
-    Make an inactive player active again.
-
-    Note: The persistent data file is updated only after all
-    changes are made, not after each individual change.
-    """
+    """Make inactive players active again (each one is saved as it is made)."""
     if not players:
         print("\nNo players registered.")
         return
@@ -2819,33 +3908,9 @@ def make_player_active():
 
     print("\n=== Make Player Active ===")
 
-    # Show inactive players in two columns
-    total = len(inactive_players)
-    half = (total + 1) // 2
-
-    print("-" * 64)
-    left_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-    right_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-    print(f"{left_header}  {right_header}")
-    print("-" * 64)
-
-    for i in range(half):
-        # Left column
-        left_no = i + 1
-        left_player = inactive_players[i][:20]
-        left_line = f"{left_no:<3} {left_player:<20} {'INAC':<6}"
-
-        # Right column (if exists)
-        right_idx = i + half
-        if right_idx < total:
-            right_no = right_idx + 1
-            right_player = inactive_players[right_idx][:20]
-            right_line = f"{right_no:<3} {right_player:<20} {'INAC':<6}"
-            print(f"{left_line}  {right_line}")
-        else:
-            print(left_line)
-
-    print("-" * 64)
+    # Show inactive players
+    cells = [player_cell(n, p, "INAC") for n, p in enumerate(inactive_players, 1)]
+    show(column_lines(cells, len(PLAYER_HEADER), PLAYER_HEADER))
 
     made_active_count = 0
 
@@ -2874,7 +3939,7 @@ def make_player_active():
             if all(1 <= num <= len(inactive_players) for num in player_numbers):
                 selected_players = [inactive_players[num - 1] for num in player_numbers]
                 for selected_player in selected_players:
-                    inactive_players.remove(selected_player)
+                    activate_player(selected_player)
                     made_active_count += 1
                     print(f"\n✓ {selected_player.upper()} has been made active")
                 if inactive_players:
@@ -2888,12 +3953,12 @@ def make_player_active():
             print("Please enter valid numbers, ranges, or 'all'.")
 
     if made_active_count > 0:
-        save_data()
         print(f"\nFinished. Made {made_active_count} player(s) active.")
     else:
         print("\nNo players were made active.")
 
 
+@screen_timed
 def edit_player_name():
     """Edit an existing player's name"""
     if not players:
@@ -2903,16 +3968,12 @@ def edit_player_name():
     sorted_players = sorted(players)
 
     print("\n=== Edit Player Name ===")
-    print("-" * 40)
-    print(f"{'No.':<4} {'Player':<30}")
-    print("-" * 40)
-    for i, player in enumerate(sorted_players, 1):
-        print(f"{i:<4} {player:<30}")
-    print("-" * 40)
+    picker = player_picker(sorted_players)
+    picker.show()
 
     # Get player selection
     while True:
-        choice = input("\nEnter player number to edit (or Enter to cancel): ").strip()
+        choice = picker.ask("\nEnter player number to edit (or Enter to cancel): ")
         if not choice:
             print("Edit cancelled.")
             return
@@ -2937,22 +3998,11 @@ def edit_player_name():
         break
 
     # Update player name everywhere
-    original_index = players.index(old_name)
-    players[original_index] = new_name
-
-    # Update in matches too
-    for match in matches:
-        if old_name in match.get("players", []):
-            match["players"] = [
-                new_name if p == old_name else p for p in match["players"]
-            ]
-        if old_name in match.get("paid", []):
-            match["paid"] = [new_name if p == old_name else p for p in match["paid"]]
-
-    save_data()
+    rename_player(old_name, new_name)
     print(f"\n✓ Changed '{old_name}' to '{new_name}'")
 
 
+@screen_timed
 def player_management():
     """Handle player management operations"""
     while True:
@@ -2962,44 +4012,12 @@ def player_management():
             print("\nNo players registered yet.")
         else:
             sorted_players = sorted(players)
-            total = len(sorted_players)
-            half = (total + 1) // 2  # Round up for odd numbers
-
-            print("-" * 64)
-            # Fixed spacing in header
-            left_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-            right_header = f"{'No.':<3} {'Player':<20} {'Status':<6}"
-            print(f"{left_header}  {right_header}")
-            print("-" * 64)
-
-            for i in range(half):
-                # Left column
-                left_no = i + 1
-                left_player = sorted_players[i][:20]  # Truncate if too long
-                left_status = (
-                    "INAC" if sorted_players[i] in inactive_players else "Actv"
-                )
-                left_line = f"{left_no:<3} {left_player:<20} {left_status:<6}"
-
-                # Right column (if exists)
-                right_idx = i + half
-                if right_idx < total:
-                    right_no = right_idx + 1
-                    right_player = sorted_players[right_idx][
-                        :20
-                    ]  # Truncate if too long
-                    right_status = (
-                        "INAC"
-                        if sorted_players[right_idx] in inactive_players
-                        else "Actv"
-                    )
-                    right_line = f"{right_no:<3} {right_player:<20} {right_status:<6}"
-                    print(f"{left_line}  {right_line}")
-                else:
-                    print(left_line)
-
-            print("-" * 64)
-            print(f"Total: {total} players")
+            cells = [
+                player_cell(number, player, "Actv" if is_active(player) else "INAC")
+                for number, player in enumerate(sorted_players, 1)
+            ]
+            show(column_lines(cells, len(PLAYER_HEADER), PLAYER_HEADER), reserve=10)
+            print(f"Total: {len(sorted_players)} players")
 
         # Show menu options in two columns
         print("\nOptions:")
@@ -3027,6 +4045,7 @@ def player_management():
             print("Please choose a valid option.")
 
 
+@screen_timed
 def match_fees_menu():
     """Handle match fee operations"""
     while True:
@@ -3051,9 +4070,6 @@ def match_fees_menu():
                 input("\nPress Enter to continue...")
                 continue
 
-            # Get matches sorted by date
-            sorted_matches = get_matches_sorted()
-
             # Filter options
             while True:
                 print("\n=== Fees Due Per Match ===")
@@ -3068,159 +4084,41 @@ def match_fees_menu():
                 filter_choice = input("Choose filter: ").strip().lower()
                 if filter_choice == "b":
                     break
-                if filter_choice not in ["1", "2", "3", "4"]:
+                if filter_choice not in FEES_DUE_FILTERS:
                     print("Please enter 1, 2, 3, 4, or b")
                     continue
 
                 # Apply filters
-                from datetime import timedelta
-
-                today = datetime.now().date()
-
-                if filter_choice == "1":
-                    filtered_matches = [m for m in sorted_matches if m["date"] >= today]
-                elif filter_choice == "2":
-                    start_date = today - timedelta(days=14)
-                    end_date = today + timedelta(days=14)
-                    filtered_matches = [
-                        m for m in sorted_matches if start_date <= m["date"] <= end_date
-                    ]
-                elif filter_choice == "3":
-                    # Only matches with outstanding fees
-                    filtered_matches = []
-                    for match in sorted_matches:
-                        if match["players"]:
-                            paid_count = len(match.get("paid", []))
-                            total_players = len(match["players"])
-                            if paid_count < total_players:
-                                filtered_matches.append(match)
-                else:  # choice == '4'
-                    filtered_matches = sorted_matches
+                window, conditions = FEES_DUE_FILTERS[filter_choice]
+                filtered_matches = window_matches(window, conditions)
 
                 if not filtered_matches:
                     print("\nNo matches found for the selected criteria.")
                     input("\nPress Enter to continue...")
                     continue
 
-                # Display fees due per match in two columns (team sheets style)
+                # Display fees due per match side by side (team sheets style)
                 print(f"\n=== Fees Due Per Match ({len(filtered_matches)} matches) ===")
-                print()
-
-                total_outstanding = 0
-                matches_with_fees_due = 0
-
-                # Process matches in pairs for two-column display
-                for i in range(0, len(filtered_matches), 2):
-                    # Left column match
-                    left_match = filtered_matches[i]
-                    left_date = left_match["date"].strftime("%d %b %y").upper()
-                    left_num = i + 1
-                    left_header = (
-                        f"{left_num}. {left_date} VS {left_match['opponent'].upper()}"
-                    )
-
-                    # Right column match (if exists)
-                    right_match = (
-                        filtered_matches[i + 1]
-                        if i + 1 < len(filtered_matches)
-                        else None
-                    )
-                    if right_match:
-                        right_date = right_match["date"].strftime("%d %b %y").upper()
-                        right_num = i + 2
-                        right_header = (
-                            f"{right_num}. {right_date} VS "
-                            f"{right_match['opponent'].upper()}"
-                        )
-
-                    # Calculate fees for left match
-                    if not left_match["players"]:
-                        left_unpaid = []
-                        left_fees_due = 0
-                    else:
-                        left_paid_players = set(left_match.get("paid", []))
-                        left_unpaid = [
-                            p
-                            for p in left_match["players"]
-                            if p not in left_paid_players
-                        ]
-                        left_fees_due = len(left_unpaid) * left_match["fee"]
-                        total_outstanding += left_fees_due
-                        if left_fees_due > 0:
-                            matches_with_fees_due += 1
-
-                    # Calculate fees for right match
-                    if right_match:
-                        if not right_match["players"]:
-                            right_unpaid = []
-                            right_fees_due = 0
-                        else:
-                            right_paid_players = set(right_match.get("paid", []))
-                            right_unpaid = [
-                                p
-                                for p in right_match["players"]
-                                if p not in right_paid_players
-                            ]
-                            right_fees_due = len(right_unpaid) * right_match["fee"]
-                            total_outstanding += right_fees_due
-                            if right_fees_due > 0:
-                                matches_with_fees_due += 1
-
-                    # Display headers
-                    if right_match:
-                        print(f"{left_header:<40} | {right_header}")
-                        print("-" * 40 + " " + "-" * 40)
-                    else:
-                        print(left_header)
-                        print("-" * 40)
-
-                    # Display players who owe fees side by side
-                    max_unpaid = max(
-                        len(left_unpaid), len(right_unpaid) if right_match else 0
-                    )
-
-                    for j in range(max_unpaid):
-                        if j < len(left_unpaid):
-                            left_player = (
-                                f"  {j+1:2}. {left_unpaid[j]:<20} "
-                                f"£{left_match['fee']:.2f}"
-                            )
-
-                        else:
-                            left_player = ""
-
-                        if right_match and j < len(right_unpaid):
-                            right_player = (
-                                f"  {j+1:2}. {right_unpaid[j]:<20} "
-                                f"£{right_match['fee']:.2f}"
-                            )
-
-                        else:
-                            right_player = ""
 
-                        if right_match:
-                            print(f"{left_player:<35} | {right_player}")
-                        else:
-                            print(left_player)
+                figures = match_fee_summary(filtered_matches)
+                total_outstanding = figures["total_due"] / 100
+                matches_with_fees_due = sum(1 for due in figures["due"] if due > 0)
 
+                blocks = []
+                for number, match in enumerate(filtered_matches, 1):
+                    date_fmt = match["date"].strftime("%d %b %y")
+                    unpaid = unpaid_players(match)
+                    header = f"{number}. {date_fmt} VS {match['opponent']}"
+                    block = [header.upper(), "-"]
+                    block += [
+                        f"  {j:2}. {player:<20} £{match['fee']:.2f}"
+                        for j, player in enumerate(unpaid, 1)
+                    ]
                     # Show "All fees paid" if team selected but no fees due
-                    if left_match["players"] and not left_unpaid:
-                        left_status = "  ✓ All fees paid"
-                    else:
-                        left_status = ""
-
-                    if right_match and right_match["players"] and not right_unpaid:
-                        right_status = "  ✓ All fees paid"
-                    else:
-                        right_status = ""
-
-                    if left_status or right_status:
-                        if right_match:
-                            print(f"{left_status:<35} | {right_status}")
-                        else:
-                            print(left_status)
-
-                    print()  # Space between match pairs
+                    if match["players"] and not unpaid:
+                        block.append("  ✓ All fees paid")
+                    blocks.append(block)
+                show([""] + side_by_side(blocks, TEAM_SHEET_WIDTH) + [""], reserve=12)
 
                 # Summary
                 print("-" * 40)
@@ -3262,59 +4160,16 @@ def match_fees_menu():
             while True:
                 print("\n=== Player Fee Balances ===")
 
-                # Calculate balances for all players
-                player_balances = []
-                total_outstanding = 0
-
-                for player in sorted(players):
-                    total_owed = 0
-                    total_paid = 0
-
-                    for match in matches:
-                        if player in match.get("players", []):
-                            total_owed += match["fee"]
-                            if player in match.get("paid", []):
-                                total_paid += match["fee"]
-
-                    balance_due = total_owed - total_paid
-                    total_outstanding += balance_due
-
-                    # Only include players who owe money
-                    if balance_due > 0:
-                        player_balances.append((player, balance_due))
+                # Balances are kept up to date as teams and payments change
+                player_balances = players_owing()
+                total_outstanding = total_outstanding_fees()
 
                 if not player_balances:
                     print("\nNo outstanding fees - all players are up to date!")
                     input("\nPress Enter to continue...")
                     break
 
-                # Display in two columns
-                total_players = len(player_balances)
-                half = (total_players + 1) // 2
-
-                print("-" * 70)
-                left_header = f"{'Player':<20} {'Due':<8}"
-                right_header = f"{'Player':<20} {'Due':<8}"
-                print(f"{left_header}  {right_header}")
-                print("-" * 70)
-
-                for i in range(half):
-                    # Left column
-                    left_player, left_amount = player_balances[i]
-                    left_player_display = left_player[:19]  # Truncate if too long
-                    left_line = f"{left_player_display:<20} £{left_amount:.2f}  "
-
-                    # Right column (if exists)
-                    right_idx = i + half
-                    if right_idx < total_players:
-                        right_player, right_amount = player_balances[right_idx]
-                        right_player_display = right_player[:19]
-                        right_line = f"{right_player_display:<20} £{right_amount:.2f}"
-                        print(f"{left_line} {right_line}")
-                    else:
-                        print(left_line)
-
-                print("-" * 70)
+                show(balance_lines(player_balances), reserve=8)
                 print(f"TOTAL OUTSTANDING: £{total_outstanding:.2f}")
                 print(f"Players with fees due: {len(player_balances)}")
 
@@ -3338,6 +4193,7 @@ def match_fees_menu():
             print("Please choose a valid option.")
 
 
+@screen_timed
 def show_instructions():
     """Display usage instructions for the program."""
     print("\n=== Help / Instructions ===\n")
@@ -3377,12 +4233,12 @@ def show_instructions():
     input("\nPress Enter to return to the main menu...")
 
 
+@screen_timed
 def main():
     """
     Add club name if not already added.
     Display the main menu for match fees tracker
     """
-    global club_name
     while True:
         if club_name:
             print(f"\n=== Match Fees Tracker - {club_name} ===")
@@ -3390,7 +4246,8 @@ def main():
             print("\n=== Match Fees Tracker - [Club Name Not Set] ===")
 
         if not club_name:
-            club_name = smart_title(input("\nEnter the name of your club: ").strip())
+            name = input("\nEnter the name of your club: ").strip()
+            set_club_name(smart_title(name))
             continue
 
         print("\nMANAGE:")
@@ -3405,8 +4262,7 @@ def main():
         print()
 
         if not club_name:
-            club_name = smart_title(input("Enter the name of your club: ").strip())
-            save_data()
+            set_club_name(smart_title(input("Enter the name of your club: ").strip()))
             continue
 
         choice = input("Choose option from menu above: ").strip()
@@ -3445,6 +4301,73 @@ def main():
             print("Please choose a valid option.")
 
 
+# Written by a waiting worker once its club is loaded (an OSC sequence, so
+# a terminal ignores it if it is ever shown)
+READY_MARKER = "\x1b]match-fees-ready\x07"
+
+
+def data_files_stamp():
+    """Return the size and modification time of each file the club is in."""
+    if STORAGE == "sqlite":
+        paths = [DATABASE_FILE, DATABASE_FILE + "-wal"]
+    else:
+        paths = [DATA_FILE, JOURNAL_FILE]
+    stamp = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+        except OSError:
+            stamp.append(None)
+            continue
+        stamp.append((info.st_mtime_ns, info.st_size))
+    return stamp
+
+
+def buffer_output():
+    """
+    Make stdout block buffered when it is a terminal (where Python would
+    otherwise write every line as it is printed).  input() flushes it, so
+    a whole screen goes out at once just before each prompt.
+    """
+    if not BUFFER_OUTPUT or not sys.stdout.isatty():
+        return
+    stream = sys.stdout
+    stream.flush()
+    sys.stdout = io.TextIOWrapper(
+        io.BufferedWriter(
+            io.FileIO(stream.fileno(), "w", closefd=False), OUTPUT_BUFFER_SIZE
+        ),
+        encoding=stream.encoding,
+        errors=stream.errors,
+    )
+
+
+def wait_to_start():
+    """
+    Load the club, then wait for SIGUSR1 before showing the menu.
+
+    The web terminal keeps a few of these workers started ahead of time
+    and signals one when a visitor connects.  The club is loaded again if
+    another session changed it while this worker was waiting.  The club
+    is only claimed (see claim_club) once a visitor arrives.
+    """
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGUSR1})
+    load_data(claim=False)
+    stamp = data_files_stamp()
+    sys.stdout.write(READY_MARKER)
+    sys.stdout.flush()
+    signal.sigwait({signal.SIGUSR1})
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGUSR1})
+    claim_club()
+    if data_files_stamp() != stamp:
+        load_data()
+
+
 if __name__ == "__main__":
-    load_data()
+    start_profiling()
+    buffer_output()
+    if "--wait" in sys.argv[1:]:
+        wait_to_start()
+    else:
+        load_data()
     main()
@@ -0,0 +1,242 @@
+"""
+Multi-session server for the match fees tracker.
+
+One process loads the club once and serves many terminal sessions over
+TCP, so captains working at the same time share one up-to-date club
+instead of each running their own copy of run.py and overwriting each
+other's changes.
+
+Each session runs the normal menus on its own thread.  Only one session
+may touch the club at a time: a session holds state_lock while it runs
+and gives it up whenever it is waiting for the user to type something.
+A screen can therefore be left holding a fixture or player that another
+session has since deleted or renamed; run.record_change() refuses such
+changes with run.ClubChanged, and the session is told and taken back to
+the main menu rather than disconnected.
+
+    python server.py                 # start the server
+    python server.py --connect       # connect this terminal to it
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import queue
+import select
+import socket
+import sys
+import threading
+import time
+import traceback
+
+import run
+
+HOST = os.environ.get("MATCH_FEES_HOST", "127.0.0.1")
+PORT = int(os.environ.get("MATCH_FEES_PORT", "8765"))
+# Seconds --connect keeps trying a server that is starting or restarting
+CONNECT_WAIT = 10
+
+CHANGED_ELSEWHERE = "Another session changed the club while this screen was open."
+
+state_lock = threading.Lock()
+current = threading.local()
+
+
+class SessionClosed(BaseException):
+    """Raised in a session's thread when its connection has gone away."""
+
+
+class Session:
+    """One connected terminal: queued input lines and buffered output."""
+
+    def __init__(self, loop, writer):
+        self.loop = loop
+        self.writer = writer
+        self.lines = queue.Queue()
+        self.output = []
+        self.club_changed = False  # by another session while waiting for input
+
+    def write(self, text):
+        self.output.append(text)
+        return len(text)
+
+    def flush(self):
+        if not self.output:
+            return
+        data = "".join(self.output).encode("utf-8")
+        self.output = []
+        self.loop.call_soon_threadsafe(self.writer.write, data)
+
+    def readline(self):
+        """Wait for the next line, letting other sessions run meanwhile."""
+        self.flush()
+        seq = run.journal_seq
+        state_lock.release()
+        try:
+            line = self.lines.get()
+        finally:
+            state_lock.acquire()
+        if run.journal_seq != seq:
+            self.club_changed = True
+        if line is None:
+            raise SessionClosed()
+        return line
+
+    def close(self):
+        self.flush()
+        self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class SessionStream:
+    """
+    Stand-in for sys.stdin and sys.stdout that reads from and writes to
+    the session running on the current thread, or the real stream when
+    there is none.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def target(self):
+        return getattr(current, "session", None) or self.stream
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def readline(self):
+        return self.target().readline()
+
+    def fileno(self):
+        # input() would otherwise read the server's own terminal
+        if getattr(current, "session", None) is not None:
+            raise io.UnsupportedOperation("fileno")
+        return self.stream.fileno()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def run_session(session):
+    """Run the main menu for one session on the current thread."""
+    current.session = session
+    state_lock.acquire()
+    try:
+        while True:
+            try:
+                run.main()
+                break
+            except run.ClubChanged as error:
+                session.write(f"\n⚠ {error}. {CHANGED_ELSEWHERE}\n")
+            except (KeyError, ValueError):
+                # A screen tripped over a fixture or player deleted or
+                # renamed by another session while it was open
+                if not session.club_changed:
+                    raise
+                traceback.print_exc(file=sys.__stderr__)
+                session.write(f"\n⚠ {CHANGED_ELSEWHERE}\n")
+            session.write("Back to the main menu.\n")
+            session.club_changed = False
+    except SessionClosed:
+        pass
+    except Exception:
+        traceback.print_exc(file=sys.__stderr__)
+        session.write("\n⚠ Something went wrong. Please reconnect.\n")
+    finally:
+        state_lock.release()
+        current.session = None
+        session.close()
+
+
+async def handle_connection(reader, writer):
+    """Start a session for a new connection and feed it what is typed."""
+    session = Session(asyncio.get_running_loop(), writer)
+    threading.Thread(target=run_session, args=(session,), daemon=True).start()
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            session.lines.put(line.decode("utf-8", "replace").rstrip("\r\n") + "\n")
+    except ConnectionError:
+        pass
+    finally:
+        session.lines.put(None)
+
+
+async def serve(host, port):
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"Match fees server for {run.club_name or 'new club'} on {host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def start_server(host, port):
+    """Load the club once and serve sessions until interrupted."""
+    run.load_data()
+    sys.stdin = SessionStream(sys.stdin)
+    sys.stdout = SessionStream(sys.stdout)
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        run.wait_for_compaction()
+
+
+def connect(host, port):
+    """Relay this terminal to a running server until either side closes."""
+    deadline = time.monotonic() + CONNECT_WAIT
+    while True:
+        try:
+            conn = socket.create_connection((host, port))
+            break
+        except OSError as error:
+            if time.monotonic() >= deadline:
+                print(
+                    f"Could not reach the match fees server on {host}:{port}: "
+                    f"{error}"
+                )
+                return 1
+            time.sleep(0.25)
+
+    stdin = sys.stdin.fileno()
+    sources = [conn, stdin]
+    with conn:
+        while True:
+            ready, _, _ = select.select(sources, [], [])
+            if conn in ready:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                sys.stdout.buffer.write(data)
+                sys.stdout.buffer.flush()
+            if stdin in ready:
+                data = os.read(stdin, 4096)
+                if data:
+                    conn.sendall(data)
+                else:
+                    conn.shutdown(socket.SHUT_WR)
+                    sources.remove(stdin)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument(
+        "--connect", action="store_true", help="connect to a running server"
+    )
+    args = parser.parse_args(argv)
+    if args.connect:
+        return connect(args.host, args.port)
+    start_server(args.host, args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Column layouts for the match fees tracker's screens.
+
+Lists are laid out in as many columns as fit across the terminal, filled
+down then across, and blocks of lines (a team sheet, a match's unpaid
+players) are set side by side.  Each row is filled in from a format
+string worked out once per table, the finished lines are printed with a
+single join, and anything taller than the terminal is shown a page at a
+time.
+"""
+
+import os
+import shutil
+import sys
+
+# Used when not on a terminal: the web terminal's size
+TERMINAL_SIZE = (80, 24)
+
+# Set MATCH_FEES_PAGING=0 to print long tables in one go
+PAGING = os.environ.get("MATCH_FEES_PAGING", "1") != "0"
+
+
+def terminal_size():
+    """Return the terminal's (columns, lines)."""
+    return tuple(shutil.get_terminal_size(TERMINAL_SIZE))
+
+
+def interactive():
+    """Return True if someone is reading the screen and can answer a prompt."""
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+
+def fit_columns(cell_width, gap, most=2):
+    """Return how many cells cell_width wide fit across the terminal (1 to most)."""
+    return max(1, min(most, (terminal_size()[0] + gap) // (cell_width + gap)))
+
+
+def split_columns(items, count):
+    """
+    Return items as rows of count columns filled down then across:
+    [a, b, c, d, e] in 2 columns is [[a, d], [b, e], [c]].
+    """
+    rows = -(-len(items) // count)
+    return [items[row::rows] for row in range(rows)]
+
+
+def row_formats(widths, gap):
+    """
+    Return a format string for each number of cells a row can have
+    (indexed by the count), each cell padded or cut to its width.
+    """
+    formats = [""]
+    for count in range(1, len(widths) + 1):
+        cells = [f"{{:<{w}.{w}}}" for w in widths[:count]]
+        formats.append(gap.join(cells))
+    return formats
+
+
+def column_lines(cells, cell_width, header=None, gap="  ", most=2):
+    """
+    Return the lines of a table with cells (text) laid out in as many
+    columns as fit (up to most), each cell_width wide, with header
+    repeated over each column and a rule above and below the cells.
+    """
+    count = fit_columns(cell_width, len(gap), most)
+    formats = row_formats([cell_width] * count, gap)
+    rule = "-" * (count * cell_width + (count - 1) * len(gap))
+    lines = [rule]
+    if header is not None:
+        lines += [formats[count].format(*[header] * count).rstrip(), rule]
+    for row in split_columns(cells, count):
+        lines.append(formats[len(row)].format(*row).rstrip())
+    lines.append(rule)
+    return lines
+
+
+def side_by_side(blocks, width, gap=" | ", most=2):
+    """
+    Return the lines of blocks (lists of lines) set side by side, as many
+    to a row as fit across the terminal (up to most), each width wide.
+    A line of "-" in a block is drawn the full width of the block.
+    """
+    count = fit_columns(width, len(gap), most)
+    formats = row_formats([width] * count, gap)
+    rule = "-" * width
+    lines = []
+    for group in split_rows(blocks, count):
+        if lines:
+            lines.append("")
+        height = max(len(block) for block in group)
+        for row in range(height):
+            cells = [
+                block[row] if row < len(block) else "" for block in group
+            ]
+            cells = [rule if cell == "-" else cell for cell in cells]
+            lines.append(formats[len(cells)].format(*cells).rstrip())
+    return lines
+
+
+def split_rows(items, count):
+    """Return items in rows of count, across then down."""
+    return [items[start : start + count] for start in range(0, len(items), count)]
+
+
+def show(lines, header=(), reserve=2):
+    """
+    Print lines, a page at a time if there are more than fit on the
+    terminal (keeping reserve lines free for what follows), with header
+    lines repeated at the top of each page.  Returns False if the user
+    stopped before the end.  Piped or scripted output is never paged.
+    """
+    lines = list(lines)
+    header = list(header)
+    height = terminal_size()[1] - len(header) - reserve - 1
+    if not PAGING or len(lines) <= height + 1 or height < 5 or not interactive():
+        print("\n".join(header + list(lines)))
+        return True
+    for start in range(0, len(lines), height):
+        if start:
+            answer = input(
+                f"-- {start} of {len(lines)} lines: Enter for more, q to stop -- "
+            )
+            if answer.strip().lower() == "q":
+                return False
+        print("\n".join(header + lines[start : start + height]))
+    return True